@@ -3,31 +3,38 @@ import logging
 from datetime import timedelta, datetime
 import asyncio
 
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers import discovery
 from homeassistant.helpers.entity import Entity
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.util import Throttle
 
 from .const import *
-from .portainer_server import PortainerServer
-from .devices.portainer_endpoint_device import PortainerEndpointDevice
+from .portainer_server import PortainerServer, DEFAULT_RATE_LIMIT, DEFAULT_MAX_IN_FLIGHT, DISK_USAGE_INTERVAL, IMAGE_UPDATE_INTERVAL, MIN_TIME_BETWEEN_UPDATES
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket_api
 
 _LOGGER = logging.getLogger(__name__)
 
 # Define platform names as constants to avoid magic strings
 # PLATFORMS = ["sensor", "switch"]
-PLATFORMS = "sensor"
+PLATFORMS = ["sensor"]
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Porthole integration without a config entry."""
     _LOGGER.info("Setting up Porthole integration without a config entry.")
-    # If there is setup logic that doesn't require config entries, add it here
-    # For now, it seems like there is nothing to initialize without a config entry.
+    # Services are registered once and look up the PortainerServer of each loaded config entry
+    await async_setup_services(hass)
+    async_setup_websocket_api(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -54,21 +61,68 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         return
 
     try:
-        # Initialize the PortainerServer object for fetching data
-        entry.portainer = PortainerServer(url, username, password)
-        await entry.portainer.update()  # Run the update asynchronously
+        # A reload hands over the authenticated client and its snapshot, no need to poll again
+        portainer = _pop_reload_cache(hass, entry)
+        reused = portainer is not None and portainer.matches(url, username, password) and bool(portainer.portainer_obj)
+        if not reused:
+            if portainer is not None:
+                await portainer.close()
+            # Initialize the PortainerServer object for fetching data
+            rate_limit, max_in_flight = _scheduler_limits(entry)
+            portainer = PortainerServer(url, username, password, rate_limit=rate_limit, max_in_flight=max_in_flight)
+        else:
+            portainer.configure_scheduler(*_scheduler_limits(entry))
+        entry.portainer = portainer
+        scope_changed = _apply_polling_scope(hass, entry)
+        if entry.data.get(CONF_PERSIST_HISTORY, False):
+            await _async_setup_history_store(hass, entry)
+        if not reused:
+            await entry.portainer.update()  # Run the update asynchronously
+        elif scope_changed:
+            # The endpoint selection or the disabled containers changed, the snapshot must follow
+            await entry.portainer.update(no_throttle=True)
+        _LOGGER.debug(f"[Porthole] Portainer Server {'reused' if reused else 'created'} for {url}.")
     except Exception as e:
         _LOGGER.error(f"[Porthole] Error initializing Portainer Server: {e}")
         return False
 
-    try:
-        # Add a device for each endpoint
-        for endpoint_index in range(0, entry.portainer.portainer_obj["measured_num_endpoints"]):
-            endpoint_id = entry.portainer.portainer_obj["endpoint_ids"][endpoint_index]
-            device = PortainerEndpointDevice(hass, entry, url, entry.portainer, endpoint_index)
-    except Exception as e:
-        _LOGGER.error(f"[Porthole] Error initializing Portainer Endpoints: {e}")
-        return False
+    # Container and service entities do not poll, the entry drives the (throttled) poll for them
+    async def _async_poll(_now=None) -> None:
+        try:
+            await entry.portainer.update()
+        except Exception as e:
+            _LOGGER.error(f"[Porthole] Error polling Portainer: {e}")
+
+    entry.async_on_unload(async_track_time_interval(hass, _async_poll, MIN_TIME_BETWEEN_UPDATES))
+
+    # Disk usage runs on its own slow tier so it never delays the container poll
+    async def _async_update_disk_usage(_now=None) -> None:
+        try:
+            await entry.portainer.update_disk_usage()
+        except Exception as e:
+            _LOGGER.error(f"[Porthole] Error updating disk usage: {e}")
+
+    entry.async_on_unload(async_track_time_interval(hass, _async_update_disk_usage, DISK_USAGE_INTERVAL))
+    if not entry.portainer.disk_usage:
+        entry.async_create_background_task(hass, _async_update_disk_usage(), "porthole_disk_usage")
+
+    # Image update checks are opt-in and run on a slow tier of their own as well
+    if entry.data.get(CONF_IMAGE_UPDATES, False):
+        async def _async_update_image_updates(_now=None) -> None:
+            try:
+                await entry.portainer.update_image_updates()
+            except Exception as e:
+                _LOGGER.error(f"[Porthole] Error checking image updates: {e}")
+
+        entry.async_on_unload(async_track_time_interval(hass, _async_update_image_updates, IMAGE_UPDATE_INTERVAL))
+        if not entry.portainer.image_updates:
+            entry.async_create_background_task(hass, _async_update_image_updates(), "porthole_image_updates")
+
+    # Endpoints that are gone (or no longer selected) take their devices and entities with them
+    _async_remove_stale_devices(hass, entry)
+
+    # Options are applied in place, without reloading the entry
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     # Forward the configuration to the sensor platform
     try:
@@ -78,15 +132,147 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         _LOGGER.error("[Porthole] Failed to set up sensor/switch platforms for Porthole: %s", ex)
         return False  # Return False to indicate failure
 
+    # Home Assistant does not unload the entries when it stops, the session is closed here instead
+    async def _async_close_on_stop(_event: Event) -> None:
+        if entry.portainer is not None:
+            await entry.portainer.close()
+
+    entry.async_on_unload(hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, _async_close_on_stop))
+
+    # Subscribers (WebSocket) follow every server through the dispatcher, whenever it was set up
+    entry.async_on_unload(entry.portainer.add_listener(lambda: async_dispatcher_send(hass, SIGNAL_SNAPSHOT_UPDATED, entry.entry_id)))
+    async_dispatcher_send(hass, SIGNAL_SNAPSHOT_UPDATED, entry.entry_id)
+
     return True
 
+async def _async_setup_history_store(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Restore the container state history and save it after polls that changed something."""
+    history = entry.portainer.state_history
+    store = Store(hass, STATE_HISTORY_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.state_history")
+    data = await store.async_load()
+    if data:
+        history.load(data)
+
+    entry.async_on_unload(entry.portainer.add_listener(lambda: store.async_delay_save(history.as_dict, STATE_HISTORY_SAVE_DELAY)))
+
+    async def _async_save_history() -> None:
+        await store.async_save(history.as_dict())
+
+    entry.async_on_unload(_async_save_history)
+
+def _pop_reload_cache(hass: HomeAssistant, entry: ConfigEntry):
+    """Take the PortainerServer an unload left behind for this entry, if any."""
+    cached = hass.data.get(DATA_RELOAD_CACHE, {}).pop(entry.entry_id, None)
+    if cached is None:
+        return None
+    portainer, cancel_expiry = cached
+    cancel_expiry()
+    return portainer
+
+def _is_reload(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Return True when an unload may be followed by a setup, i.e. Home Assistant is not stopping and the entry is not disabled."""
+    return not hass.is_stopping and entry.disabled_by is None
+
+def _push_reload_cache(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Keep the PortainerServer around for a following setup, close it if none comes in time or Home Assistant stops."""
+    portainer = entry.portainer
+
+    async def _async_expire(_now_or_event=None) -> None:
+        cached = hass.data.get(DATA_RELOAD_CACHE, {}).get(entry.entry_id)
+        if cached is not None and cached[0] is portainer:
+            _pop_reload_cache(hass, entry)
+            await portainer.close()
+
+    cancel_timer = async_call_later(hass, RELOAD_CACHE_TIMEOUT, _async_expire)
+    remove_stop_listener = hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, _async_expire)
+
+    def _cancel_expiry() -> None:
+        cancel_timer()
+        remove_stop_listener()
+
+    hass.data.setdefault(DATA_RELOAD_CACHE, {})[entry.entry_id] = (portainer, _cancel_expiry)
+
+def _async_remove_stale_devices(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the endpoint devices (and their entities) that are not in the snapshot anymore."""
+    endpoint_ids = set(entry.portainer.portainer_obj.get("endpoint_ids", []))
+    if not endpoint_ids:
+        return
+    device_registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        if not any(identifier[1] in endpoint_ids for identifier in device.identifiers):
+            _LOGGER.info(f"[Porthole] Removing stale device {device.name}.")
+            device_registry.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+def _scheduler_limits(entry: ConfigEntry) -> tuple:
+    """Return the rate limit and the maximum of requests in flight, the options override the setup data."""
+    return (
+        entry.options.get(CONF_RATE_LIMIT, entry.data.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)),
+        entry.options.get(CONF_MAX_IN_FLIGHT, entry.data.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT)),
+    )
+
+def _apply_polling_scope(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Limit polling to the selected endpoints and to containers with at least one enabled entity.
+
+    Returns True when the scope differs from the one the current snapshot was built with.
+    """
+    previous_scope = (entry.portainer.selected_endpoint_ids, set(entry.portainer.skipped_container_stems))
+    selected_endpoint_ids = entry.options.get(CONF_ENDPOINTS, entry.data.get(CONF_ENDPOINTS))
+    entry.portainer.selected_endpoint_ids = set(selected_endpoint_ids) if selected_endpoint_ids else None
+
+    disabled_stems = set()
+    enabled_stems = set()
+    for entity_entry in er.async_entries_for_config_entry(er.async_get(hass), entry.entry_id):
+        stem = _container_unique_id_stem(entity_entry.unique_id)
+        if stem is None:
+            continue
+        if entity_entry.disabled_by is not None:
+            disabled_stems.add(stem)
+        else:
+            enabled_stems.add(stem)
+    entry.portainer.set_skipped_containers(disabled_stems - enabled_stems)
+    return previous_scope != (entry.portainer.selected_endpoint_ids, entry.portainer.skipped_container_stems)
+
+def _container_unique_id_stem(unique_id: str):
+    """Return the per-container part of a container entity's unique ID, None for other entities."""
+    if "_container_" not in unique_id:
+        return None
+    for suffix in CONTAINER_UNIQUE_ID_SUFFIXES:
+        if unique_id.endswith(suffix):
+            return unique_id[:-len(suffix)]
+    return None
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running server, the platforms add and remove the entities that changed."""
+    portainer = getattr(entry, "portainer", None)
+    if portainer is None:
+        return
+    portainer.configure_scheduler(*_scheduler_limits(entry))
+    try:
+        if _apply_polling_scope(hass, entry):
+            # The snapshot follows the new endpoint selection, its listeners sync the entities
+            await portainer.update(no_throttle=True)
+    except Exception as e:
+        _LOGGER.error(f"[Porthole] Error applying the Porthole options: {e}")
+        return
+    _async_remove_stale_devices(hass, entry)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a Porthole config entry."""
     _LOGGER.info("[Porthole] Unloading Porthole integration.")
 
+    # Stop polling, but keep the authenticated client and snapshot for a reload. On shutdown or when
+    # the entry is disabled no setup follows, the server is closed right away.
+    portainer = getattr(entry, "portainer", None)
+    if portainer is not None:
+        if _is_reload(hass, entry):
+            await portainer.async_cancel_polls()
+            _push_reload_cache(hass, entry)
+        else:
+            await portainer.close()
+
     # Unload the sensor platform if necessary
     try:
-        unloaded = await hass.config_entries.async_forward_entry_unload(entry, PLATFORMS)
+        unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
         if unloaded:
             _LOGGER.info("[Porthole] Successfully unloaded sensor platform for Porthole.")
         else:
@@ -94,6 +280,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     except Exception as ex:
         _LOGGER.error("[Porthole] Error unloading sensor platform for Porthole: %s", ex)
 
+    # The server lives on in the reload cache, but it is not this entry's anymore
+    entry.portainer = None
+    async_dispatcher_send(hass, SIGNAL_SNAPSHOT_UPDATED, entry.entry_id)
+
     # Clean up any stored data
     data = hass.data.get(DOMAIN)
     if data:
@@ -104,13 +294,22 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     return True
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Close the PortainerServer the unload before the removal left in the reload cache."""
+    portainer = _pop_reload_cache(hass, entry)
+    if portainer is not None:
+        await portainer.close()
+
 async def async_reload(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Reload the Porthole integration: Unloads and re-sets up the integration."""
+    """Reload the Porthole integration: Unloads and re-sets up the integration.
+
+    The unload leaves the authenticated PortainerServer and its snapshot behind and the setup
+    picks them up again, so a reload neither re-authenticates nor waits for a full poll.
+    """
     _LOGGER.info("[Porthole] Reloading Porthole integration...")
     
     try:
-        await async_unload_entry(hass, entry)
-        await async_setup_entry(hass, entry)
+        await hass.config_entries.async_reload(entry.entry_id)
     except Exception as ex:
         _LOGGER.error(f"[Porthole] Error reloading Porthole integration: {ex}")
         return False
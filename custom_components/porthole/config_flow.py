@@ -2,13 +2,23 @@ import logging
 from datetime import timedelta
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.helpers import aiohttp_client
+import homeassistant.helpers.config_validation as cv
 from homeassistant.const import CONF_SCAN_INTERVAL
 import aiohttp
-from .const import DOMAIN
+from .const import DOMAIN, CONF_RATE_LIMIT, CONF_MAX_IN_FLIGHT, CONF_CONTAINER_DETAILS, CONF_ENDPOINTS, CONF_PERSIST_HISTORY, CONF_IMAGE_UPDATES
+from .portainer_server import DEFAULT_RATE_LIMIT, DEFAULT_MAX_IN_FLIGHT
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def _endpoint_selection(selected, offered):
+    """Return the endpoint IDs to store, empty (monitor all, including endpoints added later) when every offered one is selected."""
+    if set(offered) <= set(selected):
+        return []
+    return [int(endpoint_id) for endpoint_id in selected]
+
 class PortainerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Portainer."""
 
@@ -17,6 +27,7 @@ class PortainerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         """Initialize the config flow."""
         self._user_input = None
+        self._endpoints = {}  # Endpoint ID (as str) -> name, offered in the endpoints step
         self._scan_interval = timedelta(minutes=10)  # Default scan interval
 
     async def async_step_user(self, user_input=None):
@@ -40,10 +51,11 @@ class PortainerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         json={"Username": username, "Password": password},
                     ) as response:
                         if response.status == 200:
-                            # Authentication successful
-                            return self.async_create_entry(
-                                title=f"Portainer at {url}", data=user_input
-                            )
+                            # Authentication successful, let the user pick the endpoints to monitor
+                            jwt = (await response.json()).get("jwt")
+                            self._user_input = user_input
+                            self._endpoints = await self._get_endpoints(session, url, jwt)
+                            return await self.async_step_endpoints()
                         else:
                             # Handle failed authentication
                             _LOGGER.error(f"Failed authentication for {url}: {response.status}")
@@ -60,6 +72,38 @@ class PortainerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_endpoints(self, user_input=None):
+        """Handle the selection of the endpoints to monitor."""
+        if user_input is not None or not self._endpoints:
+            data = dict(self._user_input)
+            data[CONF_ENDPOINTS] = _endpoint_selection((user_input or {}).get(CONF_ENDPOINTS, []), self._endpoints)
+            return self.async_create_entry(title=f'Portainer at {data["url"]}', data=data)
+
+        return self.async_show_form(
+            step_id="endpoints",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_ENDPOINTS, default=list(self._endpoints)): cv.multi_select(self._endpoints),
+                }
+            ),
+        )
+
+    async def _get_endpoints(self, session, url, jwt):
+        """Return the endpoints offered for selection, empty if they cannot be listed."""
+        try:
+            async with session.get(f"{url}/api/endpoints", headers={"Authorization": f"Bearer {jwt}"}) as response:
+                response.raise_for_status()
+                return {str(endpoint["Id"]): endpoint["Name"] for endpoint in await response.json()}
+        except aiohttp.ClientError as err:
+            _LOGGER.error(f"Could not list endpoints at {url}: {err}")
+            return {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow handler."""
+        return PortainerOptionsFlow(config_entry)
+
     def _get_data_schema(self):
         """Return the data schema for the configuration flow."""
         return vol.Schema(
@@ -69,5 +113,57 @@ class PortainerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required("password", description="Portainer Password"): str,
                 vol.Optional(CONF_SCAN_INTERVAL, default=10): vol.All(int, vol.Range(min=1, max=60)
                 ),
+                # Requests per second and concurrent requests Porthole may send to the Portainer server
+                vol.Optional(CONF_RATE_LIMIT, default=DEFAULT_RATE_LIMIT): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=100)),
+                vol.Optional(CONF_MAX_IN_FLIGHT, default=DEFAULT_MAX_IN_FLIGHT): vol.All(int, vol.Range(min=1, max=32)),
+                # Offer a details sensor (mounts, networks, ...) per container, disabled until enabled one by one
+                vol.Optional(CONF_CONTAINER_DETAILS, default=False): bool,
+                # Keep the container state transition history across restarts
+                vol.Optional(CONF_PERSIST_HISTORY, default=False): bool,
+                # Compare the running images with their registries (anonymous HEAD requests)
+                vol.Optional(CONF_IMAGE_UPDATES, default=False): bool,
             }
         )
+
+
+class PortainerOptionsFlow(config_entries.OptionsFlow):
+    """Handle the options of a Portainer config entry."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    def _current(self, key, default):
+        """Return the current value of a setting, the options override the setup data."""
+        return self._entry.options.get(key, self._entry.data.get(key, default))
+
+    def _available_endpoints(self):
+        """Return all endpoints Portainer reported on the last poll, including the ones not monitored."""
+        portainer = getattr(self._entry, "portainer", None)
+        return {str(endpoint_id): name for endpoint_id, name in (portainer.available_endpoints if portainer else {}).items()}
+
+    async def async_step_init(self, user_input=None):
+        """Select the endpoints to monitor and the request limits."""
+        if user_input is not None:
+            return self.async_create_entry(
+                title="",
+                data={
+                    CONF_ENDPOINTS: _endpoint_selection(user_input.get(CONF_ENDPOINTS, []), self._available_endpoints()),
+                    CONF_RATE_LIMIT: user_input[CONF_RATE_LIMIT],
+                    CONF_MAX_IN_FLIGHT: user_input[CONF_MAX_IN_FLIGHT],
+                },
+            )
+
+        available_endpoints = self._available_endpoints()
+        selected = self._entry.options.get(CONF_ENDPOINTS, self._entry.data.get(CONF_ENDPOINTS)) or [int(endpoint_id) for endpoint_id in available_endpoints]
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_ENDPOINTS, default=[str(endpoint_id) for endpoint_id in selected if str(endpoint_id) in available_endpoints]): cv.multi_select(available_endpoints),
+                    # Changing the limits rebuilds the request scheduler, no reload needed
+                    vol.Optional(CONF_RATE_LIMIT, default=self._current(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=100)),
+                    vol.Optional(CONF_MAX_IN_FLIGHT, default=self._current(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT)): vol.All(int, vol.Range(min=1, max=32)),
+                }
+            ),
+        )
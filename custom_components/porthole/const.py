@@ -1,2 +1,53 @@
 # Domain name
 DOMAIN = "porthole"
+
+# Config entry keys
+CONF_RATE_LIMIT = "rate_limit"
+CONF_MAX_IN_FLIGHT = "max_in_flight"
+CONF_CONTAINER_DETAILS = "container_details"
+CONF_PERSIST_HISTORY = "persist_history"
+CONF_IMAGE_UPDATES = "image_updates"
+CONF_ENDPOINTS = "endpoints"  # Endpoint IDs to monitor, empty monitors all of them
+
+# Unique ID suffixes of the per-container entities, longest first
+CONTAINER_UNIQUE_ID_SUFFIXES = ("_image_update_sensor", "_state_since_sensor", "_flap_rate_sensor", "_restarts_sensor", "_details_sensor", "_sensor", "_switch")
+
+# A reload picks the PortainerServer up from here, it is closed if no setup follows in time
+DATA_RELOAD_CACHE = f"{DOMAIN}_reload_cache"
+RELOAD_CACHE_TIMEOUT = 60  # Seconds
+
+# Dispatched with the entry ID after every poll that changed the snapshot, on setup and on unload
+SIGNAL_SNAPSHOT_UPDATED = f"{DOMAIN}_snapshot_updated"
+
+# Storage of the container state history (when persisted)
+STATE_HISTORY_STORAGE_VERSION = 1
+STATE_HISTORY_SAVE_DELAY = 300  # Seconds
+
+# Services
+SERVICE_FETCH_LOGS = "fetch_logs"
+SERVICE_GET_CONTAINER_DETAILS = "get_container_details"
+SERVICE_PAUSE_ENDPOINT = "pause_endpoint"
+SERVICE_RESUME_ENDPOINT = "resume_endpoint"
+SERVICE_PROFILE = "profile"
+SERVICE_RECORD_TRAFFIC = "record_traffic"
+
+# Service fields
+ATTR_CONTAINER = "container"
+ATTR_ENDPOINT_ID = "endpoint_id"
+ATTR_TAIL = "tail"
+ATTR_SINCE = "since"
+ATTR_MAX_LINES = "max_lines"
+ATTR_MAX_BYTES = "max_bytes"
+ATTR_FILENAME = "filename"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_CYCLES = "cycles"
+ATTR_TOP_N = "top_n"
+ATTR_TRACEMALLOC = "tracemalloc"
+ATTR_DURATION = "duration"
+
+# Hard limits for log fetches, a chatty container must never be buffered whole
+DEFAULT_LOG_TAIL = 100
+DEFAULT_LOG_MAX_LINES = 1000
+DEFAULT_LOG_MAX_BYTES = 256 * 1024
+LOG_MAX_LINES_LIMIT = 10000
+LOG_MAX_BYTES_LIMIT = 4 * 1024 * 1024
@@ -0,0 +1,76 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def summarize_inspect(inspect_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a /containers/{id}/json response to the details Porthole exposes."""
+    config = inspect_data.get("Config") or {}
+    host_config = inspect_data.get("HostConfig") or {}
+    networks = (inspect_data.get("NetworkSettings") or {}).get("Networks") or {}
+    restart_policy = host_config.get("RestartPolicy") or {}
+
+    return {
+        "mounts": [
+            {
+                "type": mount.get("Type"),
+                "source": mount.get("Source") or mount.get("Name"),
+                "destination": mount.get("Destination"),
+                "read_only": not mount.get("RW", True),
+            }
+            for mount in inspect_data.get("Mounts") or []
+        ],
+        # Only the names, values regularly hold secrets
+        "env_names": sorted(env.split("=", 1)[0] for env in config.get("Env") or []),
+        "restart_policy": restart_policy.get("Name") or "no",
+        "restart_max_retries": restart_policy.get("MaximumRetryCount", 0),
+        "restart_count": inspect_data.get("RestartCount", 0),
+        "networks": {name: network.get("IPAddress") for name, network in networks.items()},
+        "labels": config.get("Labels") or {},
+    }
+
+
+class ContainerDetailsCache:
+    """Size-bounded LRU cache with TTL for container inspect details, keyed by container ID.
+
+    Every entry remembers the (state, image) fingerprint of the container at fetch time
+    and is dropped as soon as a poll reports a different one.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self._max_size: int = max_size
+        self._ttl: float = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[Any, ...], Dict[str, Any]]]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, container_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached details, or None when missing or expired."""
+        entry = self._entries.get(container_id)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            if entry is not None:
+                del self._entries[container_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(container_id)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, container_id: str, fingerprint: Tuple[Any, ...], details: Dict[str, Any]) -> None:
+        """Store details, evicting the least recently used entries beyond the size bound."""
+        self._entries[container_id] = (time.monotonic(), fingerprint, details)
+        self._entries.move_to_end(container_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_if_changed(self, container_id: str, fingerprint: Tuple[Any, ...]) -> None:
+        """Drop the entry when the container's state or image no longer matches."""
+        entry = self._entries.get(container_id)
+        if entry is not None and entry[1] != fingerprint:
+            del self._entries[container_id]
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+
+from .request_scheduler import PRIORITY_BACKGROUND
+
+_LOGGER = logging.getLogger(__name__)
+
+TO_REDACT = {"url", "username", "password"}
+
+# Device diagnostics inspect every container of the endpoint, a few at a time
+DIAGNOSTICS_MAX_INSPECTS = 4
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> Dict[str, Any]:
+    """Return diagnostics for a config entry, only what is already in memory."""
+    portainer = entry.portainer
+    portainer_obj = portainer.portainer_obj
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "portainer_id": portainer_obj.get("portainer_id"),
+        "portainer_version": portainer_obj.get("portainer_version"),
+        "endpoints": {
+            endpoint_info["endpoint_id"]: {
+                "name": endpoint_info["name"],
+                "measured_num_containers": endpoint_info["measured_num_containers"],
+                "measured_num_services": endpoint_info.get("measured_num_services", 0),
+            }
+            for endpoint_info in portainer_obj.get("endpoints", [])
+        },
+        "request_scheduler": portainer.scheduler.as_dict(),
+        "image_digest_cache": {
+            "size": len(portainer.image_digests),
+            "hits": portainer.image_digests.hits,
+            "requests": portainer.image_digests.requests,
+        },
+        "container_details_cache": {
+            "size": len(portainer.container_details),
+            "hits": portainer.container_details.hits,
+            "misses": portainer.container_details.misses,
+        },
+    }
+
+
+async def async_get_device_diagnostics(hass: HomeAssistant, entry: ConfigEntry, device: DeviceEntry) -> Dict[str, Any]:
+    """Return diagnostics for an endpoint device, including the inspect details of its containers."""
+    portainer = entry.portainer
+    endpoint_ids = {identifier[1] for identifier in device.identifiers}
+    for endpoint_info in portainer.portainer_obj.get("endpoints", []):
+        if endpoint_info["endpoint_id"] in endpoint_ids:
+            break
+    else:
+        return {}
+
+    # A one-off dump: bounded so it does not flood Portainer, and kept out of the inspect cache
+    # so it does not evict the details the container sensors rely on
+    semaphore = asyncio.Semaphore(DIAGNOSTICS_MAX_INSPECTS)
+
+    async def _inspect(container_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await portainer.inspect_container(endpoint_info["endpoint_id"], container_id, priority=PRIORITY_BACKGROUND)
+
+    container_ids = [container_info["container_id"] for container_info in endpoint_info["containers"]]
+    results = await asyncio.gather(*(_inspect(container_id) for container_id in container_ids), return_exceptions=True)
+    return {
+        "endpoint_id": endpoint_info["endpoint_id"],
+        "name": endpoint_info["name"],
+        "containers": {
+            container_name: result if not isinstance(result, Exception) else {"error": str(result)}
+            for container_name, result in zip(endpoint_info["container_names"], results)
+        },
+    }
@@ -0,0 +1,61 @@
+import logging
+from typing import Any, Dict
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of largest volumes kept in the summary
+TOP_VOLUMES = 10
+
+
+def summarize_disk_usage(df_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a Docker /system/df response to sizes and reclaimable bytes per category."""
+    images = df_data.get("Images") or []
+    containers = df_data.get("Containers") or []
+    volumes = df_data.get("Volumes") or []
+    build_cache = df_data.get("BuildCache") or []
+
+    # Images: unused images can be removed, minus the layers they share with images still in use
+    images_size = df_data.get("LayersSize") or sum(image.get("Size", 0) for image in images)
+    images_reclaimable = sum(
+        image.get("Size", 0) - max(image.get("SharedSize", 0), 0)
+        for image in images
+        if image.get("Containers", 0) == 0
+    )
+
+    # Volumes: Docker reports -1 when the size is unknown
+    volume_sizes = {
+        volume.get("Name"): max((volume.get("UsageData") or {}).get("Size", 0), 0)
+        for volume in volumes
+    }
+    volumes_size = sum(volume_sizes.values())
+    volumes_reclaimable = sum(
+        max((volume.get("UsageData") or {}).get("Size", 0), 0)
+        for volume in volumes
+        if (volume.get("UsageData") or {}).get("RefCount", 0) == 0
+    )
+
+    build_cache_size = sum(record.get("Size", 0) for record in build_cache)
+    build_cache_reclaimable = sum(
+        record.get("Size", 0) for record in build_cache if not record.get("InUse") and not record.get("Shared")
+    )
+
+    containers_size = sum(container.get("SizeRw", 0) or 0 for container in containers)
+    containers_reclaimable = sum(
+        container.get("SizeRw", 0) or 0 for container in containers if container.get("State") != "running"
+    )
+
+    return {
+        "images_count": len(images),
+        "images_size": images_size,
+        "images_reclaimable": images_reclaimable,
+        "volumes_count": len(volumes),
+        "volumes_size": volumes_size,
+        "volumes_reclaimable": volumes_reclaimable,
+        "largest_volumes": dict(sorted(volume_sizes.items(), key=lambda item: item[1], reverse=True)[:TOP_VOLUMES]),
+        "build_cache_count": len(build_cache),
+        "build_cache_size": build_cache_size,
+        "build_cache_reclaimable": build_cache_reclaimable,
+        "containers_size": containers_size,
+        "containers_reclaimable": containers_reclaimable,
+        "reclaimable": images_reclaimable + volumes_reclaimable + build_cache_reclaimable + containers_reclaimable,
+    }
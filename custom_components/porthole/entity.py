@@ -0,0 +1,60 @@
+import logging
+
+from homeassistant.helpers.entity import Entity
+
+from .portainer_server import PortainerServer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PortainerRecordEntity(Entity):
+    """Base of the entities of one container or Swarm service record of an endpoint.
+
+    The record is looked up in the current snapshot by its unique ID stem on every read, list
+    positions move as containers and services come and go. The entity is unavailable while the
+    record is not in the snapshot.
+    """
+
+    def __init__(self, portainer: PortainerServer, endpoint_id: int, stem: str) -> None:
+        self._portainer = portainer
+        self._portainer_obj = portainer.portainer_obj
+        self._endpoint_id = endpoint_id
+        self._stem = stem
+
+    def _get_record(self):
+        """Return the record from the last poll, None once it is gone."""
+        raise NotImplementedError
+
+    @property
+    def available(self):
+        """Return True while the record is in the snapshot."""
+        return self._get_record() is not None
+
+    @property
+    def device_info(self):
+        """Return device specific attributes."""
+        return self._portainer.endpoint_device_info(self._endpoint_id)
+
+
+class PortainerContainerEntity(PortainerRecordEntity):
+    """Base of the entities of a container."""
+
+    def _get_record(self):
+        return self._portainer.get_container(self._endpoint_id, self._stem)
+
+    @property
+    def _container_info(self):
+        """Return the container record from the last poll, None once the container is gone."""
+        return self._get_record()
+
+
+class PortainerSwarmServiceEntity(PortainerRecordEntity):
+    """Base of the entities of a Swarm service."""
+
+    def _get_record(self):
+        return self._portainer.get_service(self._endpoint_id, self._stem)
+
+    @property
+    def _service_info(self):
+        """Return the service record from the last poll, None once the service is gone."""
+        return self._get_record()
@@ -0,0 +1,79 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity
+
+from .const import SIGNAL_SNAPSHOT_UPDATED
+
+_LOGGER = logging.getLogger(__name__)
+
+# ("server",), ("endpoint", endpoint ID), ("container" | "service", endpoint ID, unique ID stem)
+EntityKey = Tuple[Any, ...]
+
+
+def snapshot_keys(portainer_obj: Dict[str, Any]) -> List[EntityKey]:
+    """Return the keys of everything in the snapshot that has entities, in snapshot order."""
+    keys: List[EntityKey] = [("server",)]
+    for endpoint_info in portainer_obj.get("endpoints", []):
+        endpoint_id = endpoint_info["endpoint_id"]
+        keys.append(("endpoint", endpoint_id))
+        keys.extend(("container", endpoint_id, container_stem) for container_stem in endpoint_info["containers_by_stem"])
+        keys.extend(("service", endpoint_id, service_stem) for service_stem in endpoint_info["services_by_stem"])
+    return keys
+
+
+@callback
+def async_setup_entity_sync(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: Callable[[List[Entity]], None],
+                            create_entities: Callable[[EntityKey], List[Entity]]) -> None:
+    """Add a platform's entities for the current snapshot in one batch, then keep them in step with it.
+
+    After every changed snapshot only the entities of endpoints, containers and services that
+    appeared are created and only those of the ones that disappeared are removed; the rest of
+    the platform stays as it is.
+    """
+    portainer = entry.portainer
+    entities: Dict[EntityKey, List[Entity]] = {}
+
+    @callback
+    def _async_sync(entry_id: Optional[str] = None) -> None:
+        if entry_id not in (None, entry.entry_id) or entry.portainer is not portainer:
+            return
+
+        keys = snapshot_keys(portainer.portainer_obj)
+        added: List[Entity] = []
+        for key in keys:
+            if key in entities:
+                continue
+            try:
+                entities[key] = create_entities(key)
+            except Exception as e:
+                _LOGGER.error(f"Error creating Portainer entities for {key}: {e}")
+                continue
+            added.extend(entities[key])
+
+        live_keys = set(keys)
+        removed = [entity for key in [key for key in entities if key not in live_keys] for entity in entities.pop(key)]
+        for entity in removed:
+            if entity.hass is not None:
+                hass.async_create_task(entity.async_remove())
+
+        # Entities that do not poll only write their state when the last poll changed their endpoint
+        changed_endpoint_ids = portainer.changed_endpoint_ids
+        if changed_endpoint_ids:
+            for key, key_entities in entities.items():
+                if len(key) == 3 and key[1] in changed_endpoint_ids:
+                    for entity in key_entities:
+                        if not entity.should_poll and entity.hass is not None:
+                            entity.async_write_ha_state()
+
+        if added:
+            # No update before add, the snapshot is fresh
+            async_add_entities(added)
+        if added or removed:
+            _LOGGER.debug(f"Added {len(added)} and removed {len(removed)} Portainer entities.")
+
+    _async_sync()
+    entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_SNAPSHOT_UPDATED, _async_sync))
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+DOCKER_HUB_REGISTRY = "registry-1.docker.io"
+DOCKER_HUB_ALIASES = ("docker.io", "index.docker.io", DOCKER_HUB_REGISTRY)
+
+# Registries reached over plain HTTP, e.g. a registry:2 stand-in on the same host
+INSECURE_REGISTRY_HOSTS = ("localhost", "127.0.0.1", "[::1]")
+
+# Indexes first, so multi-arch images report the digest docker keeps in RepoDigests
+MANIFEST_ACCEPT = ", ".join((
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+))
+
+REGISTRY_TIMEOUT = aiohttp.ClientTimeout(total=30)
+DEFAULT_MAX_REGISTRY_REQUESTS = 4
+DEFAULT_TOKEN_TTL = 60  # Seconds, when the token response has no expires_in
+
+_CHALLENGE_PARAM = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_image_reference(image: str) -> Optional[Tuple[str, str, str]]:
+    """Split an image reference into (registry, repository, tag).
+
+    Returns None for references pinned to a digest (nothing to update) and for image IDs.
+    """
+    if not image or image.startswith("sha256:") or "@" in image:
+        return None
+
+    name, tag = image, "latest"
+    if ":" in image.rsplit("/", 1)[-1]:
+        name, tag = image.rsplit(":", 1)
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, rest
+    else:
+        registry, repository = DOCKER_HUB_REGISTRY, name
+
+    if registry in DOCKER_HUB_ALIASES:
+        registry = DOCKER_HUB_REGISTRY
+        if "/" not in repository:
+            repository = f"library/{repository}"
+    return registry, repository, tag
+
+
+def local_digests(repo_digests: Iterable[str]) -> List[str]:
+    """Return the digests of an image's RepoDigests ("name@sha256:...")."""
+    return [repo_digest.rsplit("@", 1)[1] for repo_digest in repo_digests or [] if "@" in repo_digest]
+
+
+class RegistryDigestCache:
+    """Remote manifest digests per image reference, resolved with HEAD requests and cached with a TTL.
+
+    Concurrent lookups of the same reference share one request, so each distinct image is resolved
+    once however many containers and endpoints run it. Failures are cached too, for a shorter time.
+    """
+
+    def __init__(self, ttl: float, failure_ttl: float, max_requests: int = DEFAULT_MAX_REGISTRY_REQUESTS) -> None:
+        self._ttl: float = ttl
+        self._failure_ttl: float = failure_ttl
+        self._digests: Dict[str, Tuple[float, Optional[str]]] = {}  # Reference -> (expiry, digest)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._tokens: Dict[Tuple[str, str], Tuple[float, str]] = {}  # (realm, scope) -> (expiry, token)
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(max_requests)
+        self.requests: int = 0
+        self.hits: int = 0
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    async def get(self, session: aiohttp.ClientSession, reference: str) -> Optional[str]:
+        """Return the remote digest of an image reference, None when it cannot be resolved."""
+        entry = self._digests.get(reference)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(reference)
+        if pending is None:
+            pending = self._pending[reference] = asyncio.ensure_future(self._resolve(session, reference))
+            pending.add_done_callback(lambda _: self._pending.pop(reference, None))
+        return await asyncio.shield(pending)
+
+    def prune(self, live_references: Iterable[str]) -> None:
+        """Forget the references no container uses anymore."""
+        live_references = set(live_references)
+        for reference in [reference for reference in self._digests if reference not in live_references]:
+            del self._digests[reference]
+
+    async def _resolve(self, session: aiohttp.ClientSession, reference: str) -> Optional[str]:
+        digest = None
+        parsed = parse_image_reference(reference)
+        if parsed is not None:
+            try:
+                async with self._semaphore:
+                    digest = await self._head_manifest(session, *parsed)
+            except Exception as e:
+                _LOGGER.warning(f"Failed to resolve the registry digest of {reference}: {e}")
+        self._digests[reference] = (time.monotonic() + (self._ttl if digest else self._failure_ttl), digest)
+        return digest
+
+    async def _head_manifest(self, session: aiohttp.ClientSession, registry: str, repository: str, tag: str) -> Optional[str]:
+        """HEAD the manifest, answering an anonymous bearer challenge (Docker Hub, GHCR, ...) once."""
+        host = registry if registry.endswith("]") else registry.rsplit(":", 1)[0]
+        scheme = "http" if host in INSECURE_REGISTRY_HOSTS else "https"
+        url = f"{scheme}://{registry}/v2/{repository}/manifests/{tag}"
+        headers = {"Accept": MANIFEST_ACCEPT}
+
+        for _ in range(2):
+            self.requests += 1
+            async with session.head(url, headers=headers, timeout=REGISTRY_TIMEOUT) as response:
+                if response.status == 401 and "Authorization" not in headers:
+                    token = await self._get_token(session, response.headers.get("WWW-Authenticate", ""), repository)
+                    if token is None:
+                        return None
+                    headers["Authorization"] = f"Bearer {token}"
+                    continue
+                if response.status == 404:
+                    return None
+                response.raise_for_status()
+                return response.headers.get("Docker-Content-Digest")
+        return None
+
+    async def _get_token(self, session: aiohttp.ClientSession, challenge: str, repository: str) -> Optional[str]:
+        """Get an anonymous pull token for a bearer challenge, None for other schemes."""
+        if not challenge.lower().startswith("bearer "):
+            return None
+        params = dict(_CHALLENGE_PARAM.findall(challenge))
+        realm = params.pop("realm", None)
+        if not realm:
+            return None
+        params.setdefault("scope", f"repository:{repository}:pull")
+
+        key = (realm, params["scope"])
+        cached = self._tokens.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        self.requests += 1
+        async with session.get(realm, params=params, timeout=REGISTRY_TIMEOUT) as response:
+            response.raise_for_status()
+            token_data = await response.json(content_type=None)
+        token = token_data.get("token") or token_data.get("access_token")
+        if token:
+            self._tokens[key] = (time.monotonic() + token_data.get("expires_in", DEFAULT_TOKEN_TTL) - 5, token)
+        return token
@@ -0,0 +1,113 @@
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Docker prefixes every chunk of a non-TTY log stream with an 8 byte header:
+# [stream type, 0, 0, 0, size (4 bytes, big endian)]
+FRAME_HEADER_SIZE = 8
+STREAM_NAMES = {0: "stdin", 1: "stdout", 2: "stderr"}
+
+
+class DockerLogDecoder:
+    """Incrementally decode Docker's multiplexed stdout/stderr log stream."""
+
+    def __init__(self, max_line_bytes: int) -> None:
+        self._max_line_bytes: int = max_line_bytes
+        self._buffer: bytearray = bytearray()
+        self._frame_stream: Optional[str] = None
+        self._frame_remaining: int = 0
+        self._raw: Optional[bool] = None  # None until the first bytes tell us if the stream is multiplexed
+        self._partial_lines: Dict[str, bytearray] = {}
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, str]]:
+        """Feed the next chunk of the stream and return the completed (stream, line) pairs."""
+        self._buffer.extend(chunk)
+        lines: List[Tuple[str, str]] = []
+
+        if self._raw is None:
+            if len(self._buffer) < FRAME_HEADER_SIZE:
+                return lines
+            # Containers started with a TTY send their output unframed
+            self._raw = self._buffer[0] not in STREAM_NAMES or self._buffer[1:4] != b"\x00\x00\x00"
+
+        if self._raw:
+            self._split_lines("stdout", bytes(self._buffer), lines)
+            self._buffer.clear()
+            return lines
+
+        while self._buffer:
+            if self._frame_remaining == 0:
+                if len(self._buffer) < FRAME_HEADER_SIZE:
+                    break
+                self._frame_stream = STREAM_NAMES.get(self._buffer[0], "stdout")
+                self._frame_remaining = int.from_bytes(self._buffer[4:8], "big")
+                del self._buffer[:FRAME_HEADER_SIZE]
+                continue
+
+            payload = bytes(self._buffer[:self._frame_remaining])
+            del self._buffer[:len(payload)]
+            self._frame_remaining -= len(payload)
+            self._split_lines(self._frame_stream, payload, lines)
+
+        return lines
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush whatever is left once the stream has ended."""
+        lines: List[Tuple[str, str]] = []
+        if self._raw is None and self._buffer:
+            # Stream shorter than a single header, it can only be raw output
+            self._split_lines("stdout", bytes(self._buffer), lines)
+            self._buffer.clear()
+        for stream, partial in self._partial_lines.items():
+            if partial:
+                lines.append((stream, partial.decode("utf-8", errors="replace")))
+        self._partial_lines.clear()
+        return lines
+
+    def _split_lines(self, stream: str, payload: bytes, lines: List[Tuple[str, str]]) -> None:
+        """Split a payload into lines, carrying an unterminated tail over to the next payload."""
+        partial = self._partial_lines.setdefault(stream, bytearray())
+        parts = payload.split(b"\n")
+        for part in parts[:-1]:
+            partial.extend(part)
+            lines.append((stream, partial[:self._max_line_bytes].decode("utf-8", errors="replace").rstrip("\r")))
+            partial.clear()
+        partial.extend(parts[-1])
+        if len(partial) > self._max_line_bytes:
+            # A single runaway line must not grow without bound either
+            del partial[self._max_line_bytes:]
+
+
+class LogTail:
+    """Keep only the newest log lines within a hard line and byte cap."""
+
+    def __init__(self, max_lines: int, max_bytes: int) -> None:
+        self._max_lines: int = max_lines
+        self._max_bytes: int = max_bytes
+        self._lines: Deque[Tuple[str, str, int]] = deque()  # (stream, line, UTF-8 size)
+        self._bytes: int = 0
+        self.total_lines: int = 0
+        self.truncated: bool = False
+
+    def extend(self, lines: List[Tuple[str, str]]) -> None:
+        """Append decoded lines, dropping the oldest ones once a cap is exceeded."""
+        for stream, line in lines:
+            size = len(line.encode("utf-8"))
+            self._lines.append((stream, line, size))
+            self._bytes += size
+            self.total_lines += 1
+            while self._lines and (len(self._lines) > self._max_lines or self._bytes > self._max_bytes):
+                self._bytes -= self._lines.popleft()[2]
+                self.truncated = True
+
+    def as_dict(self) -> Dict[str, object]:
+        """Return the retained lines in a service response friendly form."""
+        return {
+            "lines": [{"stream": stream, "message": line} for stream, line, _ in self._lines],
+            "line_count": len(self._lines),
+            "byte_count": self._bytes,
+            "total_lines": self.total_lines,
+            "truncated": self.truncated,
+        }
@@ -8,51 +8,259 @@ from homeassistant.components.switch import SwitchEntity
 
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
-from typing import List, Dict, Any, Optional, Union
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
 import asyncio
+import hashlib
+import json
+import time
 from homeassistant.util import Throttle
+from homeassistant.util.json import json_loads
+
+from .container_details import ContainerDetailsCache, summarize_inspect
+from .disk_usage import summarize_disk_usage
+from .image_updates import RegistryDigestCache, local_digests
+from .log_stream import DockerLogDecoder, LogTail
+from .profiler import NULL_PHASE, PollProfiler
+from .state_history import ContainerStateHistory, parse_uptime
+from .traffic_recorder import TrafficRecorder
+from .request_scheduler import PortainerRequestScheduler, PRIORITY_USER, PRIORITY_POLL, PRIORITY_BACKGROUND
 
 # Define the minimum time between updates (e.g., 5 minutes)
 MIN_TIME_BETWEEN_UPDATES = timedelta(minutes=5)
 
+# Instance ID and version only change on a Portainer upgrade
+STATUS_CACHE_TTL = timedelta(hours=6)
+
+# Bounds of the lazily filled container inspect cache
+DETAILS_CACHE_SIZE = 256
+DETAILS_CACHE_TTL = timedelta(minutes=30)
+
+# /system/df is expensive on big hosts, it runs on its own slow tier
+DISK_USAGE_INTERVAL = timedelta(hours=1)
+
+# Image update checks run on their own slow tier, registry digests are cached well beyond it
+IMAGE_UPDATE_INTERVAL = timedelta(hours=1)
+IMAGE_DIGEST_TTL = timedelta(hours=6)
+IMAGE_DIGEST_FAILURE_TTL = timedelta(minutes=30)
+
+# Response bodies from this size on are decoded (and transformed) in an executor
+JSON_EXECUTOR_THRESHOLD = 256 * 1024
+
+# Transitions kept per container in the state history ring buffers
+STATE_HISTORY_SIZE = 64
+
+# Read container logs in small chunks, the decoder never needs more than one frame at a time
+LOG_CHUNK_SIZE = 16384
+
+# Defaults for the request scheduler in front of the Portainer API
+DEFAULT_RATE_LIMIT = 10.0  # Requests per second
+DEFAULT_BURST = 10
+DEFAULT_MAX_IN_FLIGHT = 4
+
+# Shorter container ID prefixes are too likely to hit another container (or a container name)
+MIN_CONTAINER_ID_PREFIX = 12
+
 _LOGGER = logging.getLogger(__name__)
 
+
+def select_container(container: str, name_matches: List[Any], id_matches: List[Any]) -> Optional[Any]:
+    """Pick the one container a service call means, an exact name beats an ID.
+
+    Raises ValueError when the name or the ID prefix matches several containers.
+    """
+    for matches, hint in ((name_matches, "pass the endpoint ID"), (id_matches, "use a longer ID")):
+        if len(matches) > 1:
+            raise ValueError(f"'{container}' matches {len(matches)} containers, {hint}.")
+        if matches:
+            return matches[0]
+    return None
+
 class PortainerServer:
     """Class to handle communication with the Portainer API."""
     
-    def __init__(self, url: str, username: str, password: str) -> None:
+    def __init__(self, url: str, username: str, password: str, rate_limit: float = DEFAULT_RATE_LIMIT,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
         self._url: str = url
         self._username: str = username
         self._password: str = password
         self._jwt: Optional[str] = None
         self._session: Optional[aiohttp.ClientSession] = None  # Reuse a session for all HTTP requests
+        self._poll_task: Optional[asyncio.Task] = None
+        self.profiler: Optional[PollProfiler] = None  # Only set while a profile is requested
+        self._polls_cancelled: bool = False
 
         self.portainer_obj: Dict[str, Union[List[str], List[Dict[str, Any]], int]] = {}
 
+        # Cached /api/status metadata (InstanceID, Version)
+        self._status: tuple[Optional[str], Optional[str]] = (None, None)
+        self._status_fetched_at: Optional[float] = None
+        self._status_task: Optional[asyncio.Task] = None
+
+        # Every Portainer API call goes through the scheduler so Porthole cannot flood the server
+        self._scheduler_limits: tuple = (rate_limit, max_in_flight)
+        self.scheduler: PortainerRequestScheduler = PortainerRequestScheduler(
+            rate=rate_limit, burst=max(DEFAULT_BURST, int(rate_limit)), max_in_flight=max_in_flight
+        )
+
+        # Per endpoint: (fingerprint of the raw container list, container names, transformed container records, records by stem)
+        self._container_cache: Dict[int, tuple] = {}
+        self._service_cache: Dict[int, tuple] = {}  # Same for the services of Swarm endpoints
+        # Endpoints whose container records were rebuilt by the last poll, only their container and service entities write their state
+        self.changed_endpoint_ids: set = set()
+
+        # Ring buffers of container state transitions (restart and flap sensors)
+        self.state_history: ContainerStateHistory = ContainerStateHistory(STATE_HISTORY_SIZE)
+
+        # Endpoint selection (None monitors all), runtime pauses and containers not worth polling
+        self.available_endpoints: Dict[int, str] = {}
+        self.selected_endpoint_ids: Optional[set] = None
+        self.paused_endpoint_ids: set = set()
+        self.skipped_container_stems: set = set()
+
+        # Set while API responses are being recorded (see the record_traffic service)
+        self.recorder: Optional[TrafficRecorder] = None
+
+        # Callbacks run after every completed poll (e.g. WebSocket subscriptions)
+        self._listeners: List[Callable[[], None]] = []
+
+        # Inspect details are only fetched on demand and kept in a bounded LRU with TTL
+        self.container_details: ContainerDetailsCache = ContainerDetailsCache(DETAILS_CACHE_SIZE, DETAILS_CACHE_TTL.total_seconds())
+        self._detail_requests: Dict[str, asyncio.Task] = {}
+
+        # Cached /system/df summaries per endpoint ID, refreshed by the slow tier only
+        self.disk_usage: Dict[int, Dict[str, Any]] = {}
+        self._disk_usage_task: Optional[asyncio.Task] = None
+
+        # Registry digests per image reference, shared by all containers and endpoints running it
+        self.image_digests: RegistryDigestCache = RegistryDigestCache(IMAGE_DIGEST_TTL.total_seconds(), IMAGE_DIGEST_FAILURE_TTL.total_seconds())
+        self._local_image_digests: Dict[tuple, List[str]] = {}  # (endpoint ID, image ID) -> RepoDigests, image IDs never change
+        self.image_updates: Dict[tuple, Dict[str, Any]] = {}  # (endpoint ID, image ID, image) -> update status
+        self._image_updates_task: Optional[asyncio.Task] = None
+
+        # In-flight log fetches, so concurrent requests for the same container share one upstream stream
+        self._log_requests: Dict[tuple, asyncio.Task] = {}
+
     async def _get_session(self) -> aiohttp.ClientSession:
         """Create a session for HTTP requests."""
         if not self._session:
             self._session = aiohttp.ClientSession()
         return self._session
 
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback run after every completed poll, returns a function removing it."""
+        self._listeners.append(listener)
+
+        def _remove_listener() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove_listener
+
+    def set_skipped_containers(self, container_stems: set) -> None:
+        """Set the containers (by unique ID stem) whose entities are all disabled."""
+        if container_stems != self.skipped_container_stems:
+            self.skipped_container_stems = set(container_stems)
+            # Cached records were built with the old set
+            self._container_cache.clear()
+
+    def pause_endpoint(self, endpoint_id: int) -> None:
+        """Stop fetching an endpoint, keeping its last-known state."""
+        self.paused_endpoint_ids.add(endpoint_id)
+        _LOGGER.info(f"Endpoint {endpoint_id} paused.")
+
+    def resume_endpoint(self, endpoint_id: int) -> None:
+        """Resume fetching a paused endpoint."""
+        self.paused_endpoint_ids.discard(endpoint_id)
+        _LOGGER.info(f"Endpoint {endpoint_id} resumed.")
+
+    def _notify_listeners(self) -> None:
+        """Tell the listeners that a new snapshot is available."""
+        for listener in list(self._listeners):
+            try:
+                listener()
+            except Exception as e:
+                _LOGGER.error(f"Error in Portainer update listener: {e}")
+
+    def configure_scheduler(self, rate_limit: float, max_in_flight: int) -> bool:
+        """Rebuild the request scheduler for new limits, returns False if they did not change.
+
+        Requests already waiting or in flight finish on the previous scheduler.
+        """
+        if (rate_limit, max_in_flight) == self._scheduler_limits:
+            return False
+        self._scheduler_limits = (rate_limit, max_in_flight)
+        self.scheduler = PortainerRequestScheduler(
+            rate=rate_limit, burst=max(DEFAULT_BURST, int(rate_limit)), max_in_flight=max_in_flight
+        )
+        _LOGGER.info(f"Request scheduler rebuilt for {rate_limit} requests/s and {max_in_flight} in flight.")
+        return True
+
+    def matches(self, url: str, username: str, password: str) -> bool:
+        """Return True when this server was created for the same Portainer and credentials."""
+        return (self._url, self._username, self._password) == (url, username, password)
+
+    async def async_cancel_polls(self) -> None:
+        """Cancel the running poll and background refreshes, keeping the client and snapshot."""
+        tasks = [
+            task
+            for task in (self._poll_task, self._status_task, self._disk_usage_task, self._image_updates_task, *self._detail_requests.values(), *self._log_requests.values())
+            if task is not None and not task.done()
+        ]
+        self._polls_cancelled = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._polls_cancelled = False
+
     async def close(self) -> None:
-        """Close the session once done."""
+        """Close the session once done, ending a running recording."""
+        await self.async_cancel_polls()
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            await recorder.async_stop()
         if self._session:
             await self._session.close()
-        
+            self._session = None
+
     @Throttle(MIN_TIME_BETWEEN_UPDATES)  # Throttle the updates
     async def update(self) -> None:
         """Update the data from Portainer API."""
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start_cycle()
+
+        # The poll runs as its own task so a reload can cancel it without cancelling the caller
+        self._poll_task = asyncio.ensure_future(self._async_update())
+        try:
+            await self._poll_task
+        except asyncio.CancelledError:
+            if not self._polls_cancelled:
+                raise
+            _LOGGER.debug("Poll cancelled.")
+        finally:
+            if profiler is not None:
+                profiler.end_cycle()
+                if profiler.finished:
+                    self.profiler = None
+
+    def _phase(self, name: str):
+        """Return a timer for a phase of the poll, a shared no-op unless a profile is running."""
+        return self.profiler.phase(name) if self.profiler is not None else NULL_PHASE
+
+    async def _async_update(self) -> None:
+        """Fetch a new snapshot from the Portainer API."""
         if not self._jwt:
-            self._jwt = await self._get_jwt()
+            with self._phase("network"):
+                self._jwt = await self._get_jwt()
 
         if self._jwt:
-            self.portainer_obj = {
+            new_obj = {
                 "attributes": [],
                 "name": "portainer_main_server",
                 "friendly_name": "portainer_main_server",
                 "endpoint_ids": [],
                 "endpoints": [],
+                "endpoints_by_id": {},
                 "endpoint_names": [],
                 "measured_num_endpoints": 0,
                 "server_sensor_name": "",
@@ -62,88 +270,302 @@ class PortainerServer:
                 "all_container_names_list": []
             }
 
-            self.portainer_obj["portainer_id"], self.portainer_obj["portainer_version"] = await self._get_status()
+            # Instance metadata only changes on a Portainer upgrade, only the very first poll waits for it
+            # and even then it is fetched alongside the endpoint list
+            with self._phase("network"):
+                if self._status_fetched_at is None:
+                    _, temp_endpoints = await asyncio.gather(self._refresh_status(), self._get_endpoints())
+                else:
+                    if time.monotonic() - self._status_fetched_at > STATUS_CACHE_TTL.total_seconds():
+                        self._schedule_status_refresh()
+                    temp_endpoints = await self._get_endpoints()
+            new_obj["portainer_id"], new_obj["portainer_version"] = self._status
 
-            # Fetch all endpoints
-            temp_endpoints = await self._get_endpoints()
-            self.portainer_obj["measured_num_endpoints"] = len(temp_endpoints)
+            # Endpoints that are not selected are neither fetched nor turned into devices
+            self.available_endpoints = {temp_endpoint["Id"]: temp_endpoint["Name"] for temp_endpoint in temp_endpoints}
+            if self.selected_endpoint_ids:
+                temp_endpoints = [temp_endpoint for temp_endpoint in temp_endpoints if temp_endpoint["Id"] in self.selected_endpoint_ids]
 
-            self.portainer_obj["server_sensor_name"] = f'[PS][Portainer Server {self.portainer_obj["portainer_id"]} Sensor]'
-            self.portainer_obj["server_sensor_unique_id"] = f'portainer_server_{self.portainer_obj["portainer_id"]}_sensor'
+            new_obj["measured_num_endpoints"] = len(temp_endpoints)
 
-            if self.portainer_obj["measured_num_endpoints"] == 0:
+            new_obj["server_sensor_name"] = f'[PS][Portainer Server {new_obj["portainer_id"]} Sensor]'
+            new_obj["server_sensor_unique_id"] = f'portainer_server_{new_obj["portainer_id"]}_sensor'
+
+            if new_obj["measured_num_endpoints"] == 0:
+                self._swap_portainer_obj(new_obj)
                 _LOGGER.error("No endpoints found in Portainer.")
                 return  # Exit early if no endpoints are found
 
-            temp_endpoint_index = 0
-            for temp_endpoint in temp_endpoints:
-                temp_endpoint_id = temp_endpoint["Id"]
+            # Paused endpoints keep their last-known record and are not fetched at all
+            previous_endpoints = {endpoint_info["endpoint_id"]: endpoint_info for endpoint_info in self.portainer_obj.get("endpoints", [])}
+            paused_endpoint_ids = {endpoint_id for endpoint_id in self.paused_endpoint_ids if endpoint_id in previous_endpoints}
+            fetched_endpoints = [temp_endpoint for temp_endpoint in temp_endpoints if temp_endpoint["Id"] not in paused_endpoint_ids]
+            endpoint_by_id = {temp_endpoint["Id"]: temp_endpoint for temp_endpoint in fetched_endpoints}
+
+            # Fetch the containers of all endpoints in parallel, the request scheduler keeps the load in check.
+            # Swarm endpoints report services and tasks instead, two requests for the whole cluster.
+            with self._phase("network"):
+                all_raw_containers = dict(zip([temp_endpoint["Id"] for temp_endpoint in fetched_endpoints], await asyncio.gather(
+                    *(
+                        self._get_swarm_raw(temp_endpoint["Id"]) if self._is_swarm(temp_endpoint) else self._get_containers_raw(temp_endpoint["Id"])
+                        for temp_endpoint in fetched_endpoints
+                    )
+                )))
+
+            # A failed fetch says nothing about the containers, the endpoint keeps its last-known record like a paused one.
+            # An endpoint that has none yet shows up without containers.
+            for endpoint_id, raw in all_raw_containers.items():
+                if raw is None and endpoint_id not in previous_endpoints:
+                    all_raw_containers[endpoint_id] = (b"[]", b"[]") if self._is_swarm(endpoint_by_id[endpoint_id]) else b"[]"
+            kept_endpoint_ids = paused_endpoint_ids | {endpoint_id for endpoint_id, raw in all_raw_containers.items() if raw is None}
 
+            changed_endpoint_ids = set()
+            container_cache = {}
+            service_cache = {}
+            for temp_endpoint in temp_endpoints:
                 # Update portainer object
-                self.portainer_obj["endpoint_ids"].append(temp_endpoint_id)
-                self.portainer_obj["endpoint_names"].append(temp_endpoint["Name"])
+                new_obj["endpoint_ids"].append(temp_endpoint["Id"])
+                new_obj["endpoint_names"].append(temp_endpoint["Name"])
+
+                if temp_endpoint["Id"] in kept_endpoint_ids:
+                    endpoint_info = previous_endpoints[temp_endpoint["Id"]]
+                    new_obj["endpoints"].append(endpoint_info)
+                    new_obj["endpoints_by_id"][temp_endpoint["Id"]] = endpoint_info
+                    if temp_endpoint["Id"] in self._container_cache:
+                        container_cache[temp_endpoint["Id"]] = self._container_cache[temp_endpoint["Id"]]
+                    if temp_endpoint["Id"] in self._service_cache:
+                        service_cache[temp_endpoint["Id"]] = self._service_cache[temp_endpoint["Id"]]
+                    new_obj["measured_total_num_containers"] = new_obj["measured_total_num_containers"] + endpoint_info["measured_num_containers"]
+                    new_obj["total_container_count"] = new_obj["total_container_count"] + endpoint_info["container_count"]
+                    new_obj["all_container_names_list"].append(endpoint_info["container_names"])
+                    continue
 
                 # Update portainer/endpoint object
-                subdict = temp_endpoint["Snapshots"][0]
-                self.portainer_obj["endpoints"].append({})
-                self.portainer_obj["endpoints"][temp_endpoint_index] = {}
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_id"] = temp_endpoint_id
-                self.portainer_obj["endpoints"][temp_endpoint_index]["name"] = temp_endpoint["Name"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_device_name"] = f'[PED][{temp_endpoint_index}][{self.portainer_obj["endpoints"][temp_endpoint_index]["name"]}]'
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_device_unique_id"] = f"portainer_endpoint_{temp_endpoint_id:0>3}_device"
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_sensor_name"] = f'[PES][{temp_endpoint_id}][Portainer Endpoint {temp_endpoint_id:0>3} Sensor]'
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_sensor_unique_id"] = f"portainer_endpoint_{temp_endpoint_id:0>3}_sensor"
-                self.portainer_obj["endpoints"][temp_endpoint_index]["friendly_name"] = temp_endpoint["Name"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["endpoint_url"] = temp_endpoint["URL"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["total_cpu"] = subdict["TotalCPU"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["total_memory"] = subdict["TotalMemory"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["container_count"] = subdict["ContainerCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["running_container_count"] = subdict["RunningContainerCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["stopped_container_count"] = subdict["StoppedContainerCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["healthy_container_count"] = subdict["HealthyContainerCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["unhealthy_container_count"] = subdict["UnhealthyContainerCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["volumes_count"] = subdict["VolumeCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["images_count"] = subdict["ImageCount"]
-                self.portainer_obj["endpoints"][temp_endpoint_index]["container_names"] = []
-                self.portainer_obj["endpoints"][temp_endpoint_index]["containers"] = []
-                
+                endpoint_info = self._build_endpoint_record(temp_endpoint)
+                new_obj["endpoints"].append(endpoint_info)
+                new_obj["endpoints_by_id"][temp_endpoint["Id"]] = endpoint_info
+
+                if endpoint_info["swarm"]:
+                    # Same short-circuit as for containers, over the services and tasks bodies
+                    raw_services, raw_tasks = all_raw_containers[temp_endpoint["Id"]]
+                    fingerprint = hashlib.blake2b(raw_services + b"\0" + raw_tasks, digest_size=16).digest()
+                    cached = self._service_cache.get(temp_endpoint["Id"])
+                    if cached is not None and cached[0] == fingerprint:
+                        endpoint_info["service_names"], endpoint_info["services"], endpoint_info["services_by_stem"] = cached[1:]
+                    elif len(raw_services) + len(raw_tasks) >= JSON_EXECUTOR_THRESHOLD:
+                        changed_endpoint_ids.add(temp_endpoint["Id"])
+                        with self._phase("executor"):
+                            await asyncio.get_running_loop().run_in_executor(
+                                None, self._decode_and_transform_services, endpoint_info, raw_services, raw_tasks
+                            )
+                    else:
+                        changed_endpoint_ids.add(temp_endpoint["Id"])
+                        with self._phase("json_decode"):
+                            temp_services, temp_tasks = self._decode_json_list(raw_services), self._decode_json_list(raw_tasks)
+                        with self._phase("transform"):
+                            self._transform_services(endpoint_info, temp_services, temp_tasks)
+                    service_cache[temp_endpoint["Id"]] = (fingerprint, endpoint_info["service_names"], endpoint_info["services"], endpoint_info["services_by_stem"])
+                else:
+                    # An unchanged container list reuses last poll's records untouched, skipping the transform
+                    raw_containers = all_raw_containers[temp_endpoint["Id"]]
+                    fingerprint = hashlib.blake2b(raw_containers, digest_size=16).digest()
+                    cached = self._container_cache.get(temp_endpoint["Id"])
+                    if cached is not None and cached[0] == fingerprint:
+                        endpoint_info["container_names"], endpoint_info["containers"], endpoint_info["containers_by_stem"] = cached[1:]
+                    else:
+                        changed_endpoint_ids.add(temp_endpoint["Id"])
+                        if len(raw_containers) >= JSON_EXECUTOR_THRESHOLD:
+                            # Multi-megabyte lists are decoded and transformed off the event loop
+                            with self._phase("executor"):
+                                await asyncio.get_running_loop().run_in_executor(
+                                    None, self._decode_and_transform_containers, temp_endpoint["Id"], endpoint_info, raw_containers
+                                )
+                        else:
+                            with self._phase("json_decode"):
+                                temp_containers = self._decode_containers(temp_endpoint["Id"], raw_containers)
+                            with self._phase("transform"):
+                                self._transform_containers(endpoint_info, temp_containers)
+                        self._record_containers(endpoint_info)
+                    container_cache[temp_endpoint["Id"]] = (fingerprint, endpoint_info["container_names"], endpoint_info["containers"], endpoint_info["containers_by_stem"])
+
+                endpoint_info["measured_num_containers"] = len(endpoint_info["containers"])
+                endpoint_info["measured_num_services"] = len(endpoint_info["services"])
+                new_obj["measured_total_num_containers"] = new_obj["measured_total_num_containers"] + endpoint_info["measured_num_containers"]
+                new_obj["total_container_count"] = new_obj["total_container_count"] + endpoint_info["container_count"]
+
+                new_obj["all_container_names_list"].append(endpoint_info["container_names"])
 
-                # Await the container fetching coroutine and assign to the dict
-                temp_containers = await self._get_containers(temp_endpoint_id)
-                self.portainer_obj["endpoints"][temp_endpoint_index]["measured_num_containers"] = len(temp_containers)
-                self.portainer_obj["measured_total_num_containers"] = self.portainer_obj["measured_total_num_containers"] + len(temp_containers)
-                self.portainer_obj["total_container_count"] = self.portainer_obj["total_container_count"] + self.portainer_obj["endpoints"][temp_endpoint_index]["container_count"]
-
-                temp_container_index = 0
-                for temp_container in temp_containers:
-                    # Update portainer object
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["container_names"].append(temp_container["Names"][0].strip("/"))
-                    
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"].append({})
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["state"] = temp_container["State"]
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["name"] = f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{(temp_container["Names"][0].strip("/")).lower()}"
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["container_sensor_name"] = f'[PCS][{temp_endpoint_id:0>3}][{temp_container_index:0>3}][Portainer Endpoint {temp_endpoint_id:0>3} Container {(temp_container["Names"][0].strip("/")).lower()} Sensor]'
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["container_sensor_unique_id"] = f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{(temp_container["Names"][0].strip("/")).lower()}_sensor"
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["container_switch_name"] = f'[PCW][{temp_endpoint_id:0>3}][{temp_container_index:0>3}][Portainer Endpoint {temp_endpoint_id:0>3} Container {(temp_container["Names"][0].strip("/")).lower()} Switch]'
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["container_switch_unique_id"] = f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{(temp_container["Names"][0].strip("/")).lower()}_switch"
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["image"] = temp_container["Image"]
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["container_id"] = temp_container["Id"]
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["created"] = datetime.fromtimestamp(temp_container["Created"]).strftime("%Y%m%dT%H:%M:%S")
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["status"] = temp_container["Status"]
-                    self.portainer_obj["endpoints"][temp_endpoint_index]["containers"][temp_container_index]["ports"] = self._get_ports(temp_container)
-
-                    temp_container_index += 1
-
-                self.portainer_obj["all_container_names_list"].append(self.portainer_obj["endpoints"][temp_endpoint_index]["container_names"])
-                temp_endpoint_index += 1
+            # Endpoints that disappeared are dropped from the cache along with their records
+            self._container_cache = container_cache
+            self._service_cache = service_cache
+            if changed_endpoint_ids:
+                self.state_history.prune(
+                    ContainerStateHistory.key(endpoint_info["endpoint_id"], container_name)
+                    for endpoint_info in new_obj["endpoints"]
+                    for container_name in endpoint_info["container_names"]
+                )
+            self.changed_endpoint_ids = changed_endpoint_ids
+            endpoints_changed = new_obj["endpoint_ids"] != self.portainer_obj.get("endpoint_ids")
+            self._swap_portainer_obj(new_obj)
+            if changed_endpoint_ids or endpoints_changed:
+                with self._phase("listeners"):
+                    self._notify_listeners()
             _LOGGER.debug(self.portainer_obj)
         else:
             _LOGGER.error("Failed to authenticate with Portainer.")
 
+    def _swap_portainer_obj(self, new_obj: Dict[str, Any]) -> None:
+        """Replace the snapshot in place, entities keep a reference to the same dict."""
+        self.portainer_obj.clear()
+        self.portainer_obj.update(new_obj)
+
+    def _transform_containers(self, endpoint_info: Dict[str, Any], temp_containers: List[Dict[str, Any]]) -> None:
+        """Fill an endpoint record with the transformed records of its containers.
+
+        Only builds the records, so it can run in an executor; _record_containers updates the shared caches.
+        """
+        for temp_container in temp_containers:
+            # Containers whose entities are all disabled are not worth transforming
+            if f'portainer_endpoint_{endpoint_info["endpoint_id"]:0>3}_container_{temp_container["Names"][0].strip("/").lower()}' in self.skipped_container_stems:
+                continue
+            temp_container_index = len(endpoint_info["containers"])
+            container_info = self._build_container_record(endpoint_info["endpoint_id"], temp_container_index, temp_container)
+            endpoint_info["container_names"].append(container_info["container_name"])
+            endpoint_info["containers"].append(container_info)
+            # Entities look their container up by stem, list positions move whenever a container comes or goes
+            endpoint_info["containers_by_stem"][container_info["name"]] = container_info
+
+    def _decode_and_transform_containers(self, endpoint_id: int, endpoint_info: Dict[str, Any], raw_containers: bytes) -> None:
+        """Decode and transform a container list in one go, what runs in the executor."""
+        self._transform_containers(endpoint_info, self._decode_containers(endpoint_id, raw_containers))
+
+    def _record_containers(self, endpoint_info: Dict[str, Any]) -> None:
+        """Update the inspect cache and state history from freshly transformed container records."""
+        for container_name, container_info in zip(endpoint_info["container_names"], endpoint_info["containers"]):
+            # Cached inspect details are stale as soon as the container's state or image changes
+            self.container_details.invalidate_if_changed(container_info["container_id"], self._details_fingerprint(container_info))
+            history_key = ContainerStateHistory.key(endpoint_info["endpoint_id"], container_name)
+            self.state_history.record(history_key, container_info["state"])
+            # A restart between two polls leaves the state at running, only the uptime drops
+            self.state_history.observe_uptime(history_key, parse_uptime(container_info["status"]) if container_info["state"] == "running" else None)
+
+    def _transform_services(self, endpoint_info: Dict[str, Any], temp_services: List[Dict[str, Any]], temp_tasks: List[Dict[str, Any]]) -> None:
+        """Fill a Swarm endpoint record with one record per service, replicas counted from the tasks."""
+        running_tasks: Dict[str, int] = {}
+        desired_tasks: Dict[str, int] = {}
+        for temp_task in temp_tasks:
+            service_id = temp_task.get("ServiceID")
+            desired_tasks[service_id] = desired_tasks.get(service_id, 0) + 1
+            if (temp_task.get("Status") or {}).get("State") == "running":
+                running_tasks[service_id] = running_tasks.get(service_id, 0) + 1
+
+        temp_endpoint_id = endpoint_info["endpoint_id"]
+        for temp_service in sorted(temp_services, key=lambda temp_service: temp_service["Spec"]["Name"]):
+            spec = temp_service["Spec"]
+            service_name = spec["Name"].lower()
+            temp_service_index = len(endpoint_info["services"])
+            mode = "global" if "Global" in (spec.get("Mode") or {}) else "replicated"
+            if mode == "replicated":
+                desired_replicas = ((spec.get("Mode") or {}).get("Replicated") or {}).get("Replicas", 0)
+            else:
+                desired_replicas = desired_tasks.get(temp_service["ID"], 0)
+            update_status = temp_service.get("UpdateStatus") or {}
+
+            endpoint_info["service_names"].append(spec["Name"])
+            service_info = {
+                "service_id": temp_service["ID"],
+                "name": f"portainer_endpoint_{temp_endpoint_id:0>3}_service_{service_name}",
+                "service_sensor_name": f"[PSS][{temp_endpoint_id:0>3}][{temp_service_index:0>3}][Portainer Endpoint {temp_endpoint_id:0>3} Service {service_name} Sensor]",
+                "service_sensor_unique_id": f"portainer_endpoint_{temp_endpoint_id:0>3}_service_{service_name}_sensor",
+                "mode": mode,
+                "image": ((spec.get("TaskTemplate") or {}).get("ContainerSpec") or {}).get("Image", "").split("@")[0],
+                "desired_replicas": desired_replicas,
+                "running_replicas": running_tasks.get(temp_service["ID"], 0),
+                "update_state": update_status.get("State", "none"),
+                "update_message": update_status.get("Message", ""),
+            }
+            endpoint_info["services"].append(service_info)
+            endpoint_info["services_by_stem"][service_info["name"]] = service_info
+
+    def _decode_and_transform_services(self, endpoint_info: Dict[str, Any], raw_services: bytes, raw_tasks: bytes) -> None:
+        """Decode and transform the services and tasks of a Swarm endpoint, what runs in the executor."""
+        self._transform_services(endpoint_info, self._decode_json_list(raw_services), self._decode_json_list(raw_tasks))
+
+    def _build_endpoint_record(self, temp_endpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform an /api/endpoints entry into the endpoint record used by the entities."""
+        temp_endpoint_id = temp_endpoint["Id"]
+        # Edge endpoints that never checked in have no snapshot yet
+        subdict = (temp_endpoint.get("Snapshots") or [{}])[0]
+        return {
+            "endpoint_id": temp_endpoint_id,
+            "name": temp_endpoint["Name"],
+            "endpoint_sensor_name": f'[PES][{temp_endpoint_id}][Portainer Endpoint {temp_endpoint_id:0>3} Sensor]',
+            "endpoint_sensor_unique_id": f"portainer_endpoint_{temp_endpoint_id:0>3}_sensor",
+            "friendly_name": temp_endpoint["Name"],
+            "endpoint_url": temp_endpoint["URL"],
+            "total_cpu": subdict.get("TotalCPU", 0),
+            "total_memory": subdict.get("TotalMemory", 0),
+            "container_count": subdict.get("ContainerCount", 0),
+            "running_container_count": subdict.get("RunningContainerCount", 0),
+            "stopped_container_count": subdict.get("StoppedContainerCount", 0),
+            "healthy_container_count": subdict.get("HealthyContainerCount", 0),
+            "unhealthy_container_count": subdict.get("UnhealthyContainerCount", 0),
+            "volumes_count": subdict.get("VolumeCount", 0),
+            "images_count": subdict.get("ImageCount", 0),
+            "container_names": [],
+            "containers": [],
+            "containers_by_stem": {},
+            "swarm": self._is_swarm(temp_endpoint),
+            "service_names": [],
+            "services": [],
+            "services_by_stem": {},
+        }
+
+    def _build_container_record(self, temp_endpoint_id: int, temp_container_index: int, temp_container: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform a /containers/json entry into the container record used by the entities."""
+        original_name = temp_container["Names"][0].strip("/")
+        container_name = original_name.lower()
+        return {
+            "state": temp_container["State"],
+            "name": f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{container_name}",
+            "container_name": original_name,
+            "container_sensor_name": f'[PCS][{temp_endpoint_id:0>3}][{temp_container_index:0>3}][Portainer Endpoint {temp_endpoint_id:0>3} Container {container_name} Sensor]',
+            "container_sensor_unique_id": f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{container_name}_sensor",
+            "container_switch_name": f'[PCW][{temp_endpoint_id:0>3}][{temp_container_index:0>3}][Portainer Endpoint {temp_endpoint_id:0>3} Container {container_name} Switch]',
+            "container_switch_unique_id": f"portainer_endpoint_{temp_endpoint_id:0>3}_container_{container_name}_switch",
+            "image": temp_container["Image"],
+            "image_id": temp_container.get("ImageID"),
+            "container_id": temp_container["Id"],
+            "created": datetime.fromtimestamp(temp_container["Created"]).strftime("%Y%m%dT%H:%M:%S"),
+            "status": temp_container["Status"],
+            "ports": self._get_ports(temp_container),
+        }
+
+    @staticmethod
+    def _details_fingerprint(container_info: Dict[str, Any]) -> tuple:
+        """Return what invalidates a container's cached inspect details."""
+        return (container_info["state"], container_info["image_id"])
+
+    async def _refresh_status(self, priority: int = PRIORITY_POLL) -> None:
+        """Fetch /api/status into the instance metadata cache."""
+        portainer_id, portainer_version = await self._get_status(priority)
+        if portainer_id is None and self._status[0] is not None:
+            # Keep serving the last known metadata, the next poll will retry
+            return
+        self._status = (portainer_id, portainer_version)
+        if portainer_id is not None:
+            self._status_fetched_at = time.monotonic()
+
+    def _schedule_status_refresh(self) -> None:
+        """Refresh the instance metadata in the background, off the poll's critical path."""
+        if self._status_task is None or self._status_task.done():
+            self._status_task = asyncio.ensure_future(self._refresh_status(PRIORITY_BACKGROUND))
+
     async def _get_jwt(self) -> Optional[str]:
         """Get JWT for authentication."""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self.scheduler.slot(priority=PRIORITY_USER):
+                session = await self._get_session()
                 async with session.post(f"{self._url}/api/auth", json={"Username": self._username, "Password": self._password}) as response:
                     response.raise_for_status()
                     data = await response.json()
@@ -152,43 +574,283 @@ class PortainerServer:
             _LOGGER.error(f"Failed to get JWT: {e}")
             return None
 
+    async def _get_bytes(self, path: str, endpoint_id: Optional[int] = None, priority: int = PRIORITY_POLL,
+                         params: Optional[Dict[str, str]] = None) -> bytes:
+        """GET a Portainer API path through the request scheduler and return the raw body."""
+        session = await self._get_session()
+        for attempt in range(2):
+            async with self.scheduler.slot(endpoint_id, priority):
+                started = time.monotonic()
+                async with session.get(f"{self._url}{path}", params=params, headers={"Authorization": f"Bearer {self._jwt}"}) as response:
+                    if response.status != 401 or attempt:
+                        body = await response.read()
+                        if self.recorder is not None:
+                            # Errors are part of the traffic a replay has to reproduce
+                            self.recorder.record(path, params, response.status, body, time.monotonic() - started)
+                        response.raise_for_status()
+                        break
+            # The long-lived client outlives the JWT, authenticate again once and retry
+            self._jwt = await self._get_jwt()
+        return body
+
+    async def _get_json(self, path: str, endpoint_id: Optional[int] = None, priority: int = PRIORITY_POLL,
+                        params: Optional[Dict[str, str]] = None) -> Any:
+        """GET a Portainer API path through the request scheduler and return the decoded JSON."""
+        raw = await self._get_bytes(path, endpoint_id, priority, params)
+        if len(raw) >= JSON_EXECUTOR_THRESHOLD:
+            return await asyncio.get_running_loop().run_in_executor(None, json_loads, raw)
+        return json_loads(raw)
+
     async def _get_endpoints(self) -> List[Dict[str, Any]]:
         """Get the list of endpoints."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self._url}/api/endpoints", headers={"Authorization": f"Bearer {self._jwt}"}) as response:
-                    response.raise_for_status()
-                    return await response.json()
+            return await self._get_json("/api/endpoints")
         except Exception as e:
             _LOGGER.error(f"Failed to get endpoints: {e}")
             return []
 
-    async def _get_containers(self, endpoint_id: str) -> List[Dict[str, Any]]:
-        """Get containers for a given endpoint."""
+    async def _get_containers_raw(self, endpoint_id: int) -> Optional[bytes]:
+        """Get the undecoded container list of a given endpoint, so it can be fingerprinted first. None when the fetch failed."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self._url}/api/endpoints/{endpoint_id}/docker/containers/json?all=1", headers={"Authorization": f"Bearer {self._jwt}"}) as response:
-                    response.raise_for_status()
-                    containers = await response.json()
-                    for container in containers:
-                        container["EndpointID"] = endpoint_id  # Add EndpointID to each container for mapping
-                    return containers
+            return await self._get_bytes(f"/api/endpoints/{endpoint_id}/docker/containers/json", endpoint_id, params={"all": "1"})
         except Exception as e:
             _LOGGER.error(f"Failed to get containers for endpoint {endpoint_id}: {e}")
+            return None
+
+    @staticmethod
+    def _is_swarm(temp_endpoint: Dict[str, Any]) -> bool:
+        """Return True for endpoints that are Swarm clusters."""
+        snapshots = temp_endpoint.get("Snapshots") or [{}]
+        return bool(snapshots[0].get("Swarm"))
+
+    async def _get_swarm_raw(self, endpoint_id: int) -> Optional[tuple]:
+        """Get the undecoded services and running tasks of a Swarm endpoint, one request each. None when the fetch failed."""
+        try:
+            return tuple(await asyncio.gather(
+                self._get_bytes(f"/api/endpoints/{endpoint_id}/docker/services", endpoint_id),
+                self._get_bytes(f"/api/endpoints/{endpoint_id}/docker/tasks", endpoint_id, params={"filters": json.dumps({"desired-state": ["running"]})}),
+            ))
+        except Exception as e:
+            _LOGGER.error(f"Failed to get services for endpoint {endpoint_id}: {e}")
+            return None
+
+    def _decode_json_list(self, raw: bytes) -> List[Dict[str, Any]]:
+        """Decode a JSON list, empty when it cannot be decoded."""
+        try:
+            return json_loads(raw)
+        except ValueError as e:
+            _LOGGER.error(f"Failed to decode response: {e}")
+            return []
+
+    def _decode_containers(self, endpoint_id: int, raw_containers: bytes) -> List[Dict[str, Any]]:
+        """Decode a container list for a given endpoint."""
+        try:
+            containers = json_loads(raw_containers)
+        except ValueError as e:
+            _LOGGER.error(f"Failed to decode containers for endpoint {endpoint_id}: {e}")
             return []
+        for container in containers:
+            container["EndpointID"] = endpoint_id  # Add EndpointID to each container for mapping
+        return containers
 
-    async def _get_status(self) -> tuple[Optional[str], Optional[str]]:
+    async def _get_status(self, priority: int = PRIORITY_POLL) -> tuple[Optional[str], Optional[str]]:
         """Get the status of the Portainer instance."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self._url}/api/status", headers={"Authorization": f"Bearer {self._jwt}"}) as response:
-                    response.raise_for_status()
-                    status_data = await response.json()
-                    return status_data["InstanceID"], status_data["Version"]
+            status_data = await self._get_json("/api/status", priority=priority)
+            return status_data["InstanceID"], status_data["Version"]
         except Exception as e:
             _LOGGER.error(f"Failed to get status: {e}")
             return None, None
 
+    def get_endpoint(self, endpoint_id: int) -> Optional[Dict[str, Any]]:
+        """Return the record of an endpoint in the current snapshot, None once it is gone."""
+        return self.portainer_obj.get("endpoints_by_id", {}).get(endpoint_id)
+
+    def get_container(self, endpoint_id: int, container_stem: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a container by unique ID stem in the current snapshot, None once it is gone."""
+        endpoint_info = self.get_endpoint(endpoint_id)
+        return endpoint_info["containers_by_stem"].get(container_stem) if endpoint_info is not None else None
+
+    def get_service(self, endpoint_id: int, service_stem: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a Swarm service by unique ID stem in the current snapshot, None once it is gone."""
+        endpoint_info = self.get_endpoint(endpoint_id)
+        return endpoint_info["services_by_stem"].get(service_stem) if endpoint_info is not None else None
+
+    def endpoint_device_info(self, endpoint_id: int) -> Optional[Dict[str, Any]]:
+        """Return the device info of an endpoint, shared by all its entities so the device is registered with them."""
+        endpoint_info = self.get_endpoint(endpoint_id)
+        if endpoint_info is None:
+            return None
+        return {
+            "identifiers": {(f'portainer_{self.portainer_obj["portainer_id"]}', endpoint_info["endpoint_id"])},
+            "name": endpoint_info["name"],
+            "manufacturer": "Portainer",
+            "model": "Portainer Swarm Endpoint" if endpoint_info.get("swarm") else "Portainer Endpoint",
+            "sw_version": self.portainer_obj["portainer_version"],
+            "configuration_url": f'{self._url}/#!/{endpoint_info["endpoint_id"]}/docker/dashboard',
+        }
+
+    def match_containers(self, container: str, endpoint_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return the container records named exactly so and those whose ID is or starts with it (12+ characters)."""
+        container = container.strip("/").lower()
+        id_prefix = len(container) >= MIN_CONTAINER_ID_PREFIX
+        name_matches, id_matches = [], []
+        for endpoint_info in self.portainer_obj.get("endpoints", []):
+            if endpoint_id is not None and endpoint_info["endpoint_id"] != endpoint_id:
+                continue
+            for container_info in endpoint_info["containers"]:
+                if container_info["container_name"].lower() == container:
+                    name_matches.append({**container_info, "endpoint_id": endpoint_info["endpoint_id"]})
+                elif container_info["container_id"] == container or (id_prefix and container_info["container_id"].startswith(container)):
+                    id_matches.append({**container_info, "endpoint_id": endpoint_info["endpoint_id"]})
+        return name_matches, id_matches
+
+    def find_container(self, container: str, endpoint_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Find a container record by name, ID or unique ID prefix, optionally restricted to one endpoint.
+
+        Raises ValueError when the name or the ID prefix is ambiguous.
+        """
+        return select_container(container, *self.match_containers(container, endpoint_id))
+
+    async def fetch_logs(self, endpoint_id: int, container_id: str, tail: Optional[int] = 100, since: Optional[int] = None,
+                         max_lines: int = 1000, max_bytes: int = 262144) -> Dict[str, Any]:
+        """Fetch the tail of a container's logs (the whole log when tail is None), sharing the upstream stream with identical concurrent requests."""
+        key = (endpoint_id, container_id, tail, since, max_lines, max_bytes)
+        task = self._log_requests.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._stream_logs(endpoint_id, container_id, tail, since, max_lines, max_bytes))
+            self._log_requests[key] = task
+            task.add_done_callback(lambda _: self._log_requests.pop(key, None))
+        # Shield the shared stream so one cancelled caller does not abort it for the others
+        return await asyncio.shield(task)
+
+    async def _stream_logs(self, endpoint_id: int, container_id: str, tail: Optional[int], since: Optional[int],
+                           max_lines: int, max_bytes: int) -> Dict[str, Any]:
+        """Stream /containers/{id}/logs and decode the frames as they arrive into a bounded tail."""
+        params = {"stdout": "1", "stderr": "1", "tail": "all" if tail is None else str(tail)}
+        if since:
+            params["since"] = str(since)
+        logs_url = f"{self._url}/api/endpoints/{endpoint_id}/docker/containers/{container_id}/logs"
+
+        decoder = DockerLogDecoder(max_line_bytes=max_bytes)
+        log_tail = LogTail(max_lines=max_lines, max_bytes=max_bytes)
+        session = await self._get_session()
+        async with self.scheduler.slot(endpoint_id, PRIORITY_USER):
+            response = await session.get(logs_url, params=params, headers={"Authorization": f"Bearer {self._jwt}"})
+        # The slot only covers the request, a long download must not hold back the polls
+        async with response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(LOG_CHUNK_SIZE):
+                log_tail.extend(decoder.feed(chunk))
+        log_tail.extend(decoder.finish())
+
+        _LOGGER.debug(f"Fetched {log_tail.total_lines} log lines for container '{container_id}' on endpoint {endpoint_id}.")
+        return {"endpoint_id": endpoint_id, "container_id": container_id, **log_tail.as_dict()}
+
+    async def get_container_details(self, endpoint_id: int, container_id: str, priority: int = PRIORITY_USER) -> Dict[str, Any]:
+        """Return a container's inspect details, from the cache when possible."""
+        details = self.container_details.get(container_id)
+        if details is not None:
+            return details
+
+        task = self._detail_requests.get(container_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_container_details(endpoint_id, container_id, priority))
+            self._detail_requests[container_id] = task
+            task.add_done_callback(lambda _: self._detail_requests.pop(container_id, None))
+        return await asyncio.shield(task)
+
+    async def inspect_container(self, endpoint_id: int, container_id: str, priority: int = PRIORITY_USER) -> Dict[str, Any]:
+        """Inspect a container through Portainer and return the summary, bypassing the cache."""
+        inspect_data = await self._get_json(f"/api/endpoints/{endpoint_id}/docker/containers/{container_id}/json", endpoint_id, priority)
+        return summarize_inspect(inspect_data)
+
+    async def _fetch_container_details(self, endpoint_id: int, container_id: str, priority: int) -> Dict[str, Any]:
+        """Inspect a container through Portainer and cache the summary."""
+        details = await self.inspect_container(endpoint_id, container_id, priority)
+
+        # Fingerprint with the snapshot's view of the container so the next poll can tell if it changed
+        container_info = self.find_container(container_id, endpoint_id)
+        if container_info is not None:
+            self.container_details.put(container_id, self._details_fingerprint(container_info), details)
+            # Docker counts the restarts done by the restart policy, including those between two polls
+            self.state_history.observe_restart_count(ContainerStateHistory.key(endpoint_id, container_info["container_name"]), details["restart_count"])
+        return details
+
+    async def update_disk_usage(self) -> None:
+        """Refresh the disk usage of every endpoint, joining a refresh that is already running."""
+        if self._disk_usage_task is None or self._disk_usage_task.done():
+            self._disk_usage_task = asyncio.ensure_future(self._refresh_disk_usage())
+        await asyncio.shield(self._disk_usage_task)
+
+    async def _refresh_disk_usage(self) -> None:
+        """Fetch /system/df for all endpoints at background priority."""
+        endpoint_ids = [endpoint_id for endpoint_id in self.portainer_obj.get("endpoint_ids", []) if endpoint_id not in self.paused_endpoint_ids]
+        results = await asyncio.gather(
+            *(self._get_json(f"/api/endpoints/{endpoint_id}/docker/system/df", endpoint_id, PRIORITY_BACKGROUND) for endpoint_id in endpoint_ids),
+            return_exceptions=True,
+        )
+        for endpoint_id, result in zip(endpoint_ids, results):
+            if isinstance(result, Exception):
+                # Keep serving the last known result
+                _LOGGER.error(f"Failed to get disk usage for endpoint {endpoint_id}: {result}")
+                continue
+            self.disk_usage[endpoint_id] = summarize_disk_usage(result)
+
+    async def update_image_updates(self) -> None:
+        """Check the running images for updates, joining a check that is already running."""
+        if self._image_updates_task is None or self._image_updates_task.done():
+            self._image_updates_task = asyncio.ensure_future(self._refresh_image_updates())
+        await asyncio.shield(self._image_updates_task)
+
+    async def _refresh_image_updates(self) -> None:
+        """Compare the local digests of the running images with their registries."""
+        images = {
+            (endpoint_info["endpoint_id"], container_info["image_id"], container_info["image"])
+            for endpoint_info in self.portainer_obj.get("endpoints", [])
+            if endpoint_info["endpoint_id"] not in self.paused_endpoint_ids
+            for container_info in endpoint_info["containers"]
+            if container_info.get("image_id")
+        }
+
+        # RepoDigests only needs fetching once per image
+        image_keys = {(endpoint_id, image_id) for endpoint_id, image_id, _ in images}
+        missing = [image_key for image_key in image_keys if image_key not in self._local_image_digests]
+        results = await asyncio.gather(
+            *(self._get_json(f"/api/endpoints/{endpoint_id}/docker/images/{image_id}/json", endpoint_id, PRIORITY_BACKGROUND) for endpoint_id, image_id in missing),
+            return_exceptions=True,
+        )
+        for image_key, result in zip(missing, results):
+            if isinstance(result, Exception):
+                _LOGGER.error(f"Failed to inspect image {image_key[1]} on endpoint {image_key[0]}: {result}")
+                continue
+            self._local_image_digests[image_key] = local_digests(result.get("RepoDigests"))
+        self._local_image_digests = {image_key: digests for image_key, digests in self._local_image_digests.items() if image_key in image_keys}
+
+        # One registry lookup per distinct image reference, whatever the number of containers
+        references = sorted({image for _, _, image in images})
+        session = await self._get_session()
+        remote_digests = dict(zip(references, await asyncio.gather(*(self.image_digests.get(session, reference) for reference in references))))
+        self.image_digests.prune(references)
+
+        checked = time.time()
+        image_updates = {}
+        for endpoint_id, image_id, image in images:
+            digests = self._local_image_digests.get((endpoint_id, image_id))
+            remote_digest = remote_digests[image]
+            image_updates[(endpoint_id, image_id, image)] = {
+                # Unknown for locally built images (no RepoDigests) and unresolvable references
+                "update_available": remote_digest not in digests if digests and remote_digest else None,
+                "local_digests": digests or [],
+                "remote_digest": remote_digest,
+                "checked": checked,
+            }
+        self.image_updates = image_updates
+
+    def image_update_status(self, endpoint_id: int, container_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the last image update check of a container record, None before the first one."""
+        return self.image_updates.get((endpoint_id, container_info.get("image_id"), container_info["image"]))
+
     def _get_ports(self, in_container: Dict[str, Any]) -> List[str]:
         """Helper function to get and format container ports."""
         ports = []
@@ -202,49 +864,53 @@ class PortainerServer:
                     ports.append(f"{public_port}->{private_port}/{port_type}")
         return ports if ports else ["No ports exposed"]  # Return a default message if no ports are found
 
-    async def start_container(self, endpoint_id: str, container_id: str, endpoint_index, container_index) -> bool:
+    async def start_container(self, endpoint_id: int, container_id: str, container_stem: str) -> bool:
         """Start a container given its endpoint and container ID."""
         start_url = f"{self._url}/api/endpoints/{endpoint_id}/docker/containers/{container_id}/start"
         headers = {"Authorization": f"Bearer {self._jwt}"}
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Use POST request to start the container
-                async with session.post(start_url, headers=headers) as response:
-                    if response.status == 204:
-                        # Successfully started, no content to return
-                        _LOGGER.info(f"Endpoint ID {endpoint_id}, Container with ID '{container_id}' started successfully.")
-                        self.portainer_obj["endpoints"][endpoint_index]["containers"][container_index]["state"] = "running"
-                        return True
-                    else:
-                        # Log the response status and text for debugging
-                        # _LOGGER.error(f"Failed to start container with ID '{container_id}', Status Code: {response.status}, Response: {await response.text()}")
-                        _LOGGER.error(f"Failed to start container with ID '{container_id}', Status Code: {response.status}.")
-                        response.raise_for_status()  # Will raise exception for 4xx/5xx responses
-            except Exception as e:
-                # Catch any network-related errors
-                _LOGGER.error(f"Error starting container with ID '{container_id}': {str(e)}")
+        session = await self._get_session()
+        try:
+            # Use POST request to start the container, user actions jump ahead of background polling
+            async with self.scheduler.slot(endpoint_id, PRIORITY_USER), session.post(start_url, headers=headers) as response:
+                if response.status == 204:
+                    # Successfully started, no content to return
+                    _LOGGER.info(f"Endpoint ID {endpoint_id}, Container with ID '{container_id}' started successfully.")
+                    container_info = self.get_container(endpoint_id, container_stem)
+                    if container_info is not None:
+                        container_info["state"] = "running"
+                    return True
+                else:
+                    # Log the response status and text for debugging
+                    # _LOGGER.error(f"Failed to start container with ID '{container_id}', Status Code: {response.status}, Response: {await response.text()}")
+                    _LOGGER.error(f"Failed to start container with ID '{container_id}', Status Code: {response.status}.")
+                    response.raise_for_status()  # Will raise exception for 4xx/5xx responses
+        except Exception as e:
+            # Catch any network-related errors
+            _LOGGER.error(f"Error starting container with ID '{container_id}': {str(e)}")
         return False
                 
-    async def stop_container(self, endpoint_id: str, container_id: str, endpoint_index, container_index) -> bool:
+    async def stop_container(self, endpoint_id: int, container_id: str, container_stem: str) -> bool:
         """Stop a container given its endpoint and container ID."""
         stop_url = f"{self._url}/api/endpoints/{endpoint_id}/docker/containers/{container_id}/stop"
         headers = {"Authorization": f"Bearer {self._jwt}"}
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Use POST request to stop the container
-                async with session.post(stop_url, headers=headers) as response:
-                    if response.status == 204:
-                        # Successfully stopped, no content to return
-                        _LOGGER.info(f"Endpoint ID {endpoint_id}, Container with ID '{container_id}' stopped successfully.")
-                        self.portainer_obj["endpoints"][endpoint_index]["containers"][container_index]["state"] = "stopped"
-                        return True
-                    else:
-                        # Log the response status and text for debugging
-                        _LOGGER.warning(f"Failed to stop container with ID '{container_id}', Status Code: {response.status}, Response: {await response.text()}")
-                        response.raise_for_status()  # Will raise exception for 4xx/5xx responses
-            except Exception as e:
-                # Catch any network-related errors
-                _LOGGER.error(f"Error stopping container with ID '{container_id}': {str(e)}")
+        session = await self._get_session()
+        try:
+            # Use POST request to stop the container, user actions jump ahead of background polling
+            async with self.scheduler.slot(endpoint_id, PRIORITY_USER), session.post(stop_url, headers=headers) as response:
+                if response.status == 204:
+                    # Successfully stopped, no content to return
+                    _LOGGER.info(f"Endpoint ID {endpoint_id}, Container with ID '{container_id}' stopped successfully.")
+                    container_info = self.get_container(endpoint_id, container_stem)
+                    if container_info is not None:
+                        container_info["state"] = "stopped"
+                    return True
+                else:
+                    # Log the response status and text for debugging
+                    _LOGGER.warning(f"Failed to stop container with ID '{container_id}', Status Code: {response.status}, Response: {await response.text()}")
+                    response.raise_for_status()  # Will raise exception for 4xx/5xx responses
+        except Exception as e:
+            # Catch any network-related errors
+            _LOGGER.error(f"Error stopping container with ID '{container_id}': {str(e)}")
         return False
@@ -0,0 +1,112 @@
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Shared no-op phase, what every poll uses while no profiler is armed
+NULL_PHASE = nullcontext()
+
+
+class PollProfiler:
+    """Profile a number of poll cycles: cProfile, per-phase wall-clock timers and optionally tracemalloc.
+
+    cProfile sees everything the event loop runs while a cycle is in progress, not only Porthole.
+    """
+
+    def __init__(self, cycles: int, top_n: int = 25, trace_memory: bool = False) -> None:
+        self.cycles: int = cycles
+        self.cycles_done: int = 0
+        self._top_n: int = top_n
+        self._trace_memory: bool = trace_memory
+        self._started_tracemalloc: bool = False
+        self._profile: cProfile.Profile = cProfile.Profile()
+        self._phase_totals: Dict[str, float] = defaultdict(float)
+        self._cycle_times: List[float] = []
+        self._cycle_started: Optional[float] = None
+        self._memory_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def finished(self) -> bool:
+        """Return True once all cycles were profiled."""
+        return self.cycles_done >= self.cycles
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the poll cycle."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phase_totals[name] += time.perf_counter() - started
+
+    def start_cycle(self) -> None:
+        """Start profiling a poll cycle."""
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._cycle_started = time.perf_counter()
+        self._profile.enable()
+
+    def end_cycle(self) -> None:
+        """Stop profiling a poll cycle."""
+        self._profile.disable()
+        if self._cycle_started is not None:
+            self._cycle_times.append(time.perf_counter() - self._cycle_started)
+            self._cycle_started = None
+        self.cycles_done += 1
+        if self.finished and self._trace_memory and tracemalloc.is_tracing():
+            self._memory_snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+    def report(self) -> Dict[str, Any]:
+        """Return the results as a service response friendly dict."""
+        stats = pstats.Stats(self._profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self._top_n]
+
+        report = {
+            "cycles": self.cycles_done,
+            "cycle_times": [round(cycle_time, 6) for cycle_time in self._cycle_times],
+            "phases": {name: round(total, 6) for name, total in sorted(self._phase_totals.items())},
+            "functions": [
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "ncalls": ncalls,
+                    "tottime": round(tottime, 6),
+                    "cumtime": round(cumtime, 6),
+                }
+                for (filename, line, function), (_, ncalls, tottime, cumtime, _) in functions
+            ],
+        }
+        if self._memory_snapshot is not None:
+            report["allocations"] = [
+                {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in self._memory_snapshot.statistics("lineno")[:self._top_n]
+            ]
+        return report
+
+    def report_text(self) -> str:
+        """Return the results as a human readable report."""
+        report = self.report()
+        out = io.StringIO()
+        out.write(f'Porthole poll profile, {report["cycles"]} cycle(s)\n\n')
+        out.write("Cycle wall-clock times (s):\n")
+        for cycle_time in report["cycle_times"]:
+            out.write(f"  {cycle_time:.6f}\n")
+        out.write("\nPhase totals (s):\n")
+        for name, total in report["phases"].items():
+            out.write(f"  {name:<14} {total:.6f}\n")
+        out.write("\n")
+        pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(self._top_n)
+        if "allocations" in report:
+            out.write("Top allocations:\n")
+            for allocation in report["allocations"]:
+                out.write(f'  {allocation["location"]}: {allocation["size"]} B in {allocation["count"]} block(s)\n')
+        return out.getvalue()
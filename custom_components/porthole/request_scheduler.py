@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_USER = 0  # Switch actions and service calls someone is waiting on
+PRIORITY_POLL = 1  # Regular polling of endpoints and containers
+PRIORITY_BACKGROUND = 2  # Slow tiers and cache refreshes
+PRIORITIES = (PRIORITY_USER, PRIORITY_POLL, PRIORITY_BACKGROUND)
+
+
+class PortainerRequestScheduler:
+    """Token-bucket rate limiter and in-flight cap in front of every Portainer API call.
+
+    Waiters are served by priority first; within a priority, endpoints take turns so a
+    single large endpoint cannot starve the others.
+    """
+
+    def __init__(self, rate: float, burst: int, max_in_flight: int) -> None:
+        self._rate: float = rate
+        self._burst: int = max(1, burst)
+        self._max_in_flight: int = max(1, max_in_flight)
+        self._tokens: float = float(self._burst)
+        self._last_refill: float = time.monotonic()
+        self._in_flight: int = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # priority -> endpoint key -> waiters, endpoints rotate to the back after each grant
+        self._queues: Dict[int, "OrderedDict[Any, Deque[Tuple[asyncio.Future, float]]]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._queue_depth: int = 0
+
+        # Tuning statistics
+        self._total_requests: int = 0
+        self._total_wait: float = 0.0
+        self._max_wait: float = 0.0
+        self._max_queue_depth: int = 0
+
+    @asynccontextmanager
+    async def slot(self, endpoint_id: Any = None, priority: int = PRIORITY_POLL) -> AsyncIterator[None]:
+        """Wait for a request slot, hold it for the duration of the block."""
+        await self._acquire(endpoint_id, priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return queue depth and wait time statistics."""
+        return {
+            "queue_depth": self._queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "rate": self._rate,
+            "total_requests": self._total_requests,
+            "avg_wait": round(self._total_wait / self._total_requests, 4) if self._total_requests else 0.0,
+            "max_wait": round(self._max_wait, 4),
+        }
+
+    async def _acquire(self, endpoint_id: Any, priority: int) -> None:
+        """Take a token and an in-flight slot, queueing when none is available."""
+        self._refill()
+        if self._queue_depth == 0 and self._in_flight < self._max_in_flight and self._tokens >= 1:
+            self._grant(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority].setdefault(endpoint_id, deque())
+        queue.append((future, time.monotonic()))
+        self._queue_depth += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right as we were cancelled, hand it back
+                self._release()
+            else:
+                self._remove_waiter(priority, endpoint_id, future)
+            raise
+
+    def _release(self) -> None:
+        """Return an in-flight slot and wake up the next waiter."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _grant(self, wait: float) -> None:
+        """Account for a request that is allowed to go out."""
+        self._tokens -= 1
+        self._in_flight += 1
+        self._total_requests += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(float(self._burst), self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+    def _dispatch(self) -> None:
+        """Grant slots to waiters while tokens and in-flight capacity allow."""
+        self._refill()
+        while self._queue_depth and self._in_flight < self._max_in_flight:
+            if self._tokens < 1:
+                self._schedule_refill()
+                return
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            future, queued_at = waiter
+            self._grant(time.monotonic() - queued_at)
+            future.set_result(None)
+
+    def _next_waiter(self) -> Optional[Tuple[asyncio.Future, float]]:
+        """Pop the next live waiter by priority, rotating between endpoints."""
+        for priority in PRIORITIES:
+            endpoints = self._queues[priority]
+            while endpoints:
+                endpoint_id, queue = next(iter(endpoints.items()))
+                future, queued_at = queue.popleft()
+                self._queue_depth -= 1
+                if queue:
+                    endpoints.move_to_end(endpoint_id)
+                else:
+                    del endpoints[endpoint_id]
+                if not future.done():
+                    return future, queued_at
+        return None
+
+    def _remove_waiter(self, priority: int, endpoint_id: Any, future: asyncio.Future) -> None:
+        """Drop a cancelled waiter from its queue."""
+        queue = self._queues[priority].get(endpoint_id)
+        if not queue:
+            return
+        for waiter in queue:
+            if waiter[0] is future:
+                queue.remove(waiter)
+                self._queue_depth -= 1
+                break
+        if not queue:
+            del self._queues[priority][endpoint_id]
+
+    def _schedule_refill(self) -> None:
+        """Wake up the dispatcher once the next token is available."""
+        if self._timer is not None:
+            return
+
+        def _on_timer() -> None:
+            self._timer = None
+            self._dispatch()
+
+        delay = (1 - self._tokens) / self._rate if self._rate > 0 else 1.0
+        self._timer = asyncio.get_running_loop().call_later(delay, _on_timer)
@@ -12,10 +12,17 @@ from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.util import Throttle
 
+from .const import CONF_CONTAINER_DETAILS, CONF_IMAGE_UPDATES
+from .entity_sync import async_setup_entity_sync
 from .portainer_server import PortainerServer
 from .sensors.portainer_server_sensor import PortainerServerSensor
 from .sensors.portainer_endpoint_sensor import PortainerEndpointSensor
 from .sensors.portainer_container_sensor import PortainerContainerSensor
+from .sensors.portainer_endpoint_disk_sensor import PortainerEndpointDiskSensor, DISK_SENSOR_KINDS
+from .sensors.portainer_container_history_sensor import PortainerContainerHistorySensor, HISTORY_SENSOR_KINDS
+from .sensors.portainer_swarm_service_sensor import PortainerSwarmServiceSensor
+from .sensors.portainer_container_image_update_sensor import PortainerContainerImageUpdateSensor
+from .sensors.portainer_container_details_sensor import PortainerContainerDetailsSensor
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,42 +33,32 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _LOGGER.info("Setting up Portainer integration with config entry.")
 
     portainer = entry.portainer
-    try:
-        # Add a server sensor for the Portainer server itself
-        server_sensor = PortainerServerSensor(portainer)
-        async_add_entities([server_sensor], update_before_add=True)
-    except Exception as e:
-        _LOGGER.error(f"Error adding Portainer Server sensor: {e}")
-        return False
-        
-    try:
-        # Add endpoint sensors and container sensors for each endpoint
-        for endpoint_index in range(0, portainer.portainer_obj["measured_num_endpoints"]):
-            endpoint_id = portainer.portainer_obj["endpoint_ids"][endpoint_index]
-
-            try:
-                endpoint_sensor = PortainerEndpointSensor(portainer, endpoint_index)
-                async_add_entities([endpoint_sensor], update_before_add=True)
-            except Exception as e:
-                _LOGGER.error(f"Error adding Portainer Endpoint sensor {endpoint_index}, {endpoint_id}: {e}")
-                return False
-
-            try:
-                # Create container sensors associated with the device
-                container_sensors = [
-                    PortainerContainerSensor(portainer, endpoint_index, container_index)
-                    for container_index in range(0, portainer.portainer_obj["endpoints"][endpoint_index]["measured_num_containers"])
-                ]
-                # Now, add them all at once
-                async_add_entities(container_sensors, update_before_add=True)
-
-            except Exception as e:
-                _LOGGER.error(f"Error adding Portainer Container Sensors: {e}")
-                return False
-        
-    except Exception as e:
-        _LOGGER.error(f"Error adding Portainer sensors: {e}")
-        return False
+    with_details = entry.data.get(CONF_CONTAINER_DETAILS, False)
+    with_image_updates = entry.data.get(CONF_IMAGE_UPDATES, False)
+
+    def _create_entities(key):
+        """Create the sensors of the server, an endpoint, a container or a Swarm service."""
+        if key[0] == "server":
+            return [PortainerServerSensor(portainer)]
+        if key[0] == "endpoint":
+            # Disk usage sensors only read the slow tier's cached /system/df results
+            return [PortainerEndpointSensor(portainer, key[1])] + [PortainerEndpointDiskSensor(portainer, key[1], kind) for kind in DISK_SENSOR_KINDS]
+        if key[0] == "container":
+            sensors = [PortainerContainerSensor(portainer, key[1], key[2])]
+            # Restart/flap sensors read the in-memory transition history
+            sensors.extend(PortainerContainerHistorySensor(portainer, key[1], key[2], kind) for kind in HISTORY_SENSOR_KINDS)
+            if with_details:
+                # Disabled by default, each enabled one inspects its container
+                sensors.append(PortainerContainerDetailsSensor(portainer, key[1], key[2]))
+            if with_image_updates:
+                sensors.append(PortainerContainerImageUpdateSensor(portainer, key[1], key[2]))
+            return sensors
+        # Swarm endpoints report services rather than task containers
+        return [PortainerSwarmServiceSensor(portainer, key[1], key[2])]
+
+    # The entity set of the fresh snapshot is added in one batch, the devices are registered from the
+    # entities' device info on the way; later snapshots only add and remove what changed
+    async_setup_entity_sync(hass, entry, async_add_entities, _create_entities)
 
     return True
 
@@ -0,0 +1,71 @@
+import logging
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+
+from ..entity import PortainerContainerEntity
+from ..portainer_server import PortainerServer
+from ..request_scheduler import PRIORITY_BACKGROUND
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PortainerContainerDetailsSensor(PortainerContainerEntity, SensorEntity):
+    """Sensor exposing the inspect details of a container (mounts, networks, ...), its state is Docker's restart count."""
+
+    # Every enabled details sensor costs an inspect request per container, so they are opted into one by one
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, portainer, endpoint_id, container_stem):
+        super().__init__(portainer, endpoint_id, container_stem)
+        container_info = self._container_info
+        self._container_sensor_name = container_info["container_sensor_name"]
+        self._details = None
+
+    @property
+    def unique_id(self):
+        """Return a unique ID for the entity, based on container name."""
+        return f"{self._stem}_details_sensor"
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._container_sensor_name.replace(" Sensor]", " Details Sensor]")
+
+    @property
+    def native_value(self):
+        """Return how often Docker restarted the container, None before the first inspect."""
+        return self._details["restart_count"] if self._details is not None else None
+
+    @property
+    def icon(self):
+        """Return the icon to represent this sensor."""
+        return "mdi:information-outline"
+
+    @property
+    def extra_state_attributes(self):
+        """Return the inspect details as attributes."""
+        if self._details is None:
+            return {}
+        return {
+            "Mounts": self._details["mounts"],
+            "EnvNames": self._details["env_names"],
+            "RestartPolicy": self._details["restart_policy"],
+            "RestartMaxRetries": self._details["restart_max_retries"],
+            "Networks": self._details["networks"],
+            "Labels": self._details["labels"],
+        }
+
+    async def async_update(self):
+        """Update the inspect details, served from the cache until the container's state or image changes."""
+        await self._portainer.update()
+
+        container_info = self._container_info
+        if container_info is None:
+            return
+        try:
+            self._details = await self._portainer.get_container_details(
+                self._endpoint_id, container_info["container_id"], priority=PRIORITY_BACKGROUND
+            )
+        except Exception as e:
+            _LOGGER.error(f"Error fetching details for container {container_info["container_id"]}: {e}")
@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime, timezone
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+
+from ..entity import PortainerContainerEntity
+from ..portainer_server import PortainerServer
+from ..state_history import ContainerStateHistory
+
+_LOGGER = logging.getLogger(__name__)
+
+RESTART_WINDOW = 24 * 3600  # Restarts are counted over the last day
+FLAP_WINDOW = 3600  # Flap rate is the number of transitions over the last hour
+
+# Sensor kind -> label used in names
+HISTORY_SENSOR_KINDS = {
+    "restarts": "Restarts",
+    "flap_rate": "Flap Rate",
+    "state_since": "State Since",
+}
+
+
+class PortainerContainerHistorySensor(PortainerContainerEntity, SensorEntity):
+    """Sensor derived from the in-memory state transition history of a container."""
+
+    # One more entity per container and kind, only enabled where someone cares
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, portainer, endpoint_id, container_stem, kind):
+        super().__init__(portainer, endpoint_id, container_stem)
+        self._kind = kind
+        # References into the record, the derived strings are built on read to keep thousands of entities small
+        container_info = self._container_info
+        self._container_sensor_name = container_info["container_sensor_name"]
+        self._container_name = container_info["container_name"]
+
+        if kind == "state_since":
+            self._attr_device_class = SensorDeviceClass.TIMESTAMP
+        elif kind == "restarts":
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+            self._attr_native_unit_of_measurement = "transitions/h"
+
+    @property
+    def _history_key(self):
+        """Return the state history key of the container."""
+        return ContainerStateHistory.key(self._endpoint_id, self._container_name)
+
+    @property
+    def unique_id(self):
+        """Return a unique ID for the entity, based on container name and kind."""
+        return f"{self._stem}_{self._kind}_sensor"
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._container_sensor_name.replace(" Sensor]", f" {HISTORY_SENSOR_KINDS[self._kind]} Sensor]")
+
+    @property
+    def native_value(self):
+        """Return the value computed from the transition history."""
+        history = self._portainer.state_history
+        if self._kind == "restarts":
+            return history.restart_count(self._history_key, RESTART_WINDOW)
+        if self._kind == "flap_rate":
+            return history.transition_count(self._history_key, FLAP_WINDOW)
+        state_since = history.state_since(self._history_key)
+        return datetime.fromtimestamp(state_since, timezone.utc) if state_since is not None else None
+
+    @property
+    def icon(self):
+        """Return the icon to represent this sensor."""
+        return "mdi:history"
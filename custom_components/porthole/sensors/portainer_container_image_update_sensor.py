@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+
+from ..entity import PortainerContainerEntity
+from ..portainer_server import PortainerServer
+
+_LOGGER = logging.getLogger(__name__)
+
+UPDATE_AVAILABLE = "update_available"
+UP_TO_DATE = "up_to_date"
+
+
+class PortainerContainerImageUpdateSensor(PortainerContainerEntity, SensorEntity):
+    """Sensor telling whether the registry has a newer image than the one a container runs."""
+
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = [UPDATE_AVAILABLE, UP_TO_DATE]
+
+    def __init__(self, portainer, endpoint_id, container_stem):
+        super().__init__(portainer, endpoint_id, container_stem)
+        container_info = self._container_info
+        self._container_sensor_name = container_info["container_sensor_name"]
+
+    @property
+    def _status(self):
+        """Return the last image update check of the container."""
+        container_info = self._container_info
+        return self._portainer.image_update_status(self._endpoint_id, container_info) if container_info is not None else None
+
+    @property
+    def unique_id(self):
+        """Return a unique ID for the entity, based on container name."""
+        return f"{self._stem}_image_update_sensor"
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._container_sensor_name.replace(" Sensor]", " Image Update Sensor]")
+
+    @property
+    def native_value(self):
+        """Return whether an update is available, None while unknown."""
+        status = self._status
+        if status is None or status["update_available"] is None:
+            return None
+        return UPDATE_AVAILABLE if status["update_available"] else UP_TO_DATE
+
+    @property
+    def icon(self):
+        """Return the icon to represent this sensor."""
+        return "mdi:package-up" if self.native_value == UPDATE_AVAILABLE else "mdi:package-check"
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        status = self._status or {}
+        return {
+            "Image": self._container_info["image"],
+            "ImageId": self._container_info["image_id"],
+            "LocalDigests": status.get("local_digests", []),
+            "RemoteDigest": status.get("remote_digest"),
+            "LastChecked": datetime.fromtimestamp(status["checked"]).isoformat() if status else None,
+        }
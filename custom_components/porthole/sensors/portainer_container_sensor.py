@@ -11,37 +11,45 @@ from homeassistant.helpers.device_registry import DeviceEntry
 import asyncio
 from homeassistant.util import Throttle
 
+from ..entity import PortainerContainerEntity
 from ..portainer_server import PortainerServer
+from ..state_history import ContainerStateHistory
 
 _LOGGER = logging.getLogger(__name__)
 
-class PortainerContainerSensor(SensorEntity):
+class PortainerContainerSensor(PortainerContainerEntity, SensorEntity):
     """Sensor representing a Portainer container."""
     
-    def __init__(self, portainer, endpoint_index, container_index):
-        self._portainer = portainer
-        self._portainer_obj = self._portainer.portainer_obj
-        self._endpoint_index = endpoint_index
-        self._container_index = container_index
-        self._endpoint_id = self._portainer_obj["endpoints"][self._endpoint_index]["endpoint_id"]
-        self._container_id = self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_id"]
-    
+    # Written by the entity sync when a poll changed the endpoint, unchanged endpoints cost no state writes
+    _attr_should_poll = False
+
+    def __init__(self, portainer, endpoint_id, container_stem):
+        super().__init__(portainer, endpoint_id, container_stem)
+        container_info = self._container_info
+        self._unique_id = container_info["container_sensor_unique_id"]
+        self._name = container_info["container_sensor_name"]
+        self._container_name = container_info["container_name"]
+
+    @property
+    def _history_key(self):
+        """Return the state history key of the container."""
+        return ContainerStateHistory.key(self._endpoint_id, self._container_name)
+
     @property
     def unique_id(self):
         """Return a unique ID for the entity, based on container name."""
-        _LOGGER.debug(self._container_index)
-        return self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_sensor_unique_id"]
+        return self._unique_id
 
     @property
     def name(self):
         """Return the name of the entity."""
-        return self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_sensor_name"]
+        return self._name
 
     @property
     def state(self):
         """Return the current state of the container (status)."""
         # Use the "Status" field from Portainer to represent the state
-        return self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index].get("state", "unknown")
+        return self._container_info.get("state", "unknown")
 
     @property
     def icon(self):
@@ -51,10 +59,11 @@ class PortainerContainerSensor(SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return additional state attributes."""
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        container_info = endpoint_info["containers"][self._container_index]
+        endpoint_info = self._portainer.get_endpoint(self._endpoint_id)
+        container_info = self._container_info
 
-        return {
+        state_since = self._portainer.state_history.state_since(self._history_key)
+        attributes = {
             "Name": container_info["name"],
             "Image": container_info["image"],
             "ContainerId": container_info["container_id"],
@@ -67,21 +76,12 @@ class PortainerContainerSensor(SensorEntity):
             "EndpointName": endpoint_info["friendly_name"],
             "PortainerId": self._portainer_obj["portainer_id"],
             "Version": self._portainer_obj["portainer_version"],
+            "StateSince": datetime.fromtimestamp(state_since).isoformat() if state_since is not None else None,
+            "Restarts24h": self._portainer.state_history.restart_count(self._history_key, 24 * 3600),
         }
-
-    @property
-    def device_info(self):
-        """Return device specific attributes."""
-        # Device unique identifier is the serial
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        return {
-            "identifiers": {(f"portainer_{self._portainer_obj["portainer_id"]}", endpoint_info["endpoint_id"])},
-            "name": endpoint_info["name"],
-            "manufacturer": "Portainer"
-            }
+        return attributes
 
     async def async_update(self):
         """Update the server's state and attributes."""
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        _LOGGER.debug(f"Updating Portainer Container sensor: {endpoint_info["endpoint_id"]}")
+        _LOGGER.debug(f"Updating Portainer Container sensor: {self._endpoint_id}")
         await self._portainer.update()
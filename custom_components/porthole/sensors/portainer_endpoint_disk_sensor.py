@@ -0,0 +1,84 @@
+import logging
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import UnitOfInformation
+
+from ..portainer_server import PortainerServer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sensor kind -> (label, disk usage key holding the state)
+DISK_SENSOR_KINDS = {
+    "images": ("Images", "images_size"),
+    "volumes": ("Volumes", "volumes_size"),
+    "build_cache": ("Build Cache", "build_cache_size"),
+    "reclaimable": ("Reclaimable", "reclaimable"),
+}
+
+
+class PortainerEndpointDiskSensor(SensorEntity):
+    """Sensor representing the disk usage of a Portainer endpoint (from /system/df)."""
+
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+
+    def __init__(self, portainer, endpoint_id, kind):
+        self._portainer = portainer
+        self._portainer_obj = portainer.portainer_obj
+        self._endpoint_id = endpoint_id
+        self._kind = kind
+        self._label, self._key = DISK_SENSOR_KINDS[kind]
+
+    @property
+    def unique_id(self):
+        """Return a unique ID for the entity, based on endpoint ID and kind."""
+        return f"portainer_endpoint_{self._endpoint_id:0>3}_disk_{self._kind}_sensor"
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return f"[PDS][{self._endpoint_id:0>3}][Portainer Endpoint {self._endpoint_id:0>3} Disk {self._label} Sensor]"
+
+    @property
+    def native_value(self):
+        """Return the size in bytes from the last /system/df refresh."""
+        disk_usage = self._portainer.disk_usage.get(self._endpoint_id)
+        return disk_usage[self._key] if disk_usage else None
+
+    @property
+    def icon(self):
+        """Return the icon for the sensor."""
+        return "mdi:harddisk"
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        disk_usage = self._portainer.disk_usage.get(self._endpoint_id)
+        if not disk_usage:
+            return {"EndpointId": self._endpoint_id}
+
+        attributes = {"EndpointId": self._endpoint_id}
+        if self._kind == "images":
+            attributes.update({"ImageCount": disk_usage["images_count"], "Reclaimable": disk_usage["images_reclaimable"]})
+        elif self._kind == "volumes":
+            attributes.update({
+                "VolumeCount": disk_usage["volumes_count"],
+                "Reclaimable": disk_usage["volumes_reclaimable"],
+                "LargestVolumes": disk_usage["largest_volumes"],
+            })
+        elif self._kind == "build_cache":
+            attributes.update({"BuildCacheCount": disk_usage["build_cache_count"], "Reclaimable": disk_usage["build_cache_reclaimable"]})
+        else:
+            attributes.update({
+                "ImagesReclaimable": disk_usage["images_reclaimable"],
+                "VolumesReclaimable": disk_usage["volumes_reclaimable"],
+                "BuildCacheReclaimable": disk_usage["build_cache_reclaimable"],
+                "ContainersReclaimable": disk_usage["containers_reclaimable"],
+            })
+        return attributes
+
+    @property
+    def device_info(self):
+        """Return device specific attributes."""
+        return self._portainer.endpoint_device_info(self._endpoint_id)
@@ -18,25 +18,32 @@ _LOGGER = logging.getLogger(__name__)
 class PortainerEndpointSensor(SensorEntity):
     """Sensor representing the Portainer server."""
 
-    def __init__(self, portainer, endpoint_index):
+    def __init__(self, portainer, endpoint_id):
         self._portainer = portainer
         self._portainer_obj = portainer.portainer_obj
-        self._endpoint_index = endpoint_index
-        self._endpoint_id = self._portainer_obj["endpoints"][self._endpoint_index]["endpoint_id"]
+        self._endpoint_id = endpoint_id
+        endpoint_info = self._portainer.get_endpoint(self._endpoint_id)
+        self._unique_id = endpoint_info["endpoint_sensor_unique_id"]
+        self._name = endpoint_info["endpoint_sensor_name"]
+
+    @property
+    def available(self):
+        """Return True while the endpoint is in the snapshot."""
+        return self._portainer.get_endpoint(self._endpoint_id) is not None
 
     @property
     def unique_id(self):
         """Return a unique ID for the entity, based on Portainer instance ID."""
-        return self._portainer_obj["endpoints"][self._endpoint_index]["endpoint_sensor_unique_id"]
+        return self._unique_id
 
     @property
     def name(self):
         """Return the name of the entity."""
-        return self._portainer_obj["endpoints"][self._endpoint_index]["endpoint_sensor_name"]
+        return self._name
 
     @property
     def state(self):
-        return self._portainer_obj["endpoints"][self._endpoint_index]["measured_num_containers"]
+        return self._portainer.get_endpoint(self._endpoint_id)["measured_num_containers"]
 
     @property
     def icon(self):
@@ -45,7 +52,7 @@ class PortainerEndpointSensor(SensorEntity):
 
     @property
     def extra_state_attributes(self):
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
+        endpoint_info = self._portainer.get_endpoint(self._endpoint_id)
         return {
             "EndpointId": endpoint_info["endpoint_id"],
             "FriendlyName": endpoint_info["friendly_name"],
@@ -63,21 +70,17 @@ class PortainerEndpointSensor(SensorEntity):
             "ImageCount": endpoint_info["images_count"],
             "PortainerId": self._portainer_obj["portainer_id"],
             "Version": self._portainer_obj["portainer_version"],
+            "Paused": endpoint_info["endpoint_id"] in self._portainer.paused_endpoint_ids,
+            "Swarm": endpoint_info["swarm"],
+            "Services": endpoint_info["service_names"],
         }
 
     async def async_update(self):
         """Update the server's state and attributes."""
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        _LOGGER.debug(f"Updating Portainer server: {endpoint_info["endpoint_id"]}")
+        _LOGGER.debug(f"Updating Portainer server: {self._endpoint_id}")
         await self._portainer.update()
 
     @property
     def device_info(self):
         """Return device specific attributes."""
-        # Device unique identifier is the serial
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        return {
-            "identifiers": {(f"portainer_{self._portainer_obj["portainer_id"]}", endpoint_info["endpoint_id"])},
-            "name": endpoint_info["name"],
-            "manufacturer": "Portainer"
-            }
+        return self._portainer.endpoint_device_info(self._endpoint_id)
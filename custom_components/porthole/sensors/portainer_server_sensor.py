@@ -45,6 +45,7 @@ class PortainerServerSensor(SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return additional state attributes for the server."""
+        scheduler_stats = self._portainer.scheduler.as_dict()
         return {
             "FriendlyName": self._portainer_obj["name"],
             "ContainerCount": self._portainer_obj["total_container_count"],
@@ -54,6 +55,12 @@ class PortainerServerSensor(SensorEntity):
             "Endpoints": self._portainer_obj["endpoint_names"],
             "PortainerId": self._portainer_obj["portainer_id"],
             "Version": self._portainer_obj["portainer_version"],
+            "RequestQueueDepth": scheduler_stats["queue_depth"],
+            "RequestMaxQueueDepth": scheduler_stats["max_queue_depth"],
+            "RequestsInFlight": scheduler_stats["in_flight"],
+            "RequestTotal": scheduler_stats["total_requests"],
+            "RequestAvgWait": scheduler_stats["avg_wait"],
+            "RequestMaxWait": scheduler_stats["max_wait"],
         }
 
     async def async_update(self):
@@ -0,0 +1,60 @@
+import logging
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+
+from ..entity import PortainerSwarmServiceEntity
+from ..portainer_server import PortainerServer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PortainerSwarmServiceSensor(PortainerSwarmServiceEntity, SensorEntity):
+    """Sensor representing a service of a Swarm endpoint, the number of running replicas."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    _attr_should_poll = False  # See PortainerContainerSensor
+
+    def __init__(self, portainer, endpoint_id, service_stem):
+        super().__init__(portainer, endpoint_id, service_stem)
+        service_info = self._service_info
+        self._unique_id = service_info["service_sensor_unique_id"]
+        self._name = service_info["service_sensor_name"]
+
+    @property
+    def unique_id(self):
+        """Return a unique ID for the entity, based on endpoint ID and service name."""
+        return self._unique_id
+
+    @property
+    def name(self):
+        """Return the name of the entity."""
+        return self._name
+
+    @property
+    def native_value(self):
+        """Return the number of running replicas."""
+        return self._service_info["running_replicas"]
+
+    @property
+    def icon(self):
+        """Return the icon for the sensor."""
+        service_info = self._service_info
+        if service_info is not None and service_info["running_replicas"] < service_info["desired_replicas"]:
+            return "mdi:layers-remove"
+        return "mdi:layers"
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        service_info = self._service_info
+        return {
+            "ServiceId": service_info["service_id"],
+            "Mode": service_info["mode"],
+            "Image": service_info["image"],
+            "DesiredReplicas": service_info["desired_replicas"],
+            "RunningReplicas": service_info["running_replicas"],
+            "UpdateState": service_info["update_state"],
+            "UpdateMessage": service_info["update_message"],
+            "EndpointId": self._endpoint_id,
+        }
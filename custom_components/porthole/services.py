@@ -0,0 +1,318 @@
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_component import async_update_entity
+from homeassistant.helpers.event import async_call_later
+
+from .const import *
+from .portainer_server import PortainerServer, select_container
+from .profiler import PollProfiler
+from .traffic_recorder import TrafficRecorder
+
+_LOGGER = logging.getLogger(__name__)
+
+FETCH_LOGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONTAINER): cv.string,
+        vol.Optional(ATTR_ENDPOINT_ID): vol.Coerce(int),
+        vol.Optional(ATTR_TAIL, default=DEFAULT_LOG_TAIL): vol.Any(vol.All(cv.string, vol.Lower, "all"), vol.All(vol.Coerce(int), vol.Range(min=0))),
+        vol.Optional(ATTR_SINCE): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_MAX_LINES, default=DEFAULT_LOG_MAX_LINES): vol.All(vol.Coerce(int), vol.Range(min=1, max=LOG_MAX_LINES_LIMIT)),
+        vol.Optional(ATTR_MAX_BYTES, default=DEFAULT_LOG_MAX_BYTES): vol.All(vol.Coerce(int), vol.Range(min=1024, max=LOG_MAX_BYTES_LIMIT)),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+GET_CONTAINER_DETAILS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONTAINER): cv.string,
+        vol.Optional(ATTR_ENDPOINT_ID): vol.Coerce(int),
+    }
+)
+
+
+ENDPOINT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENDPOINT_ID): vol.Coerce(int),
+    }
+)
+
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_CYCLES, default=3): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+        vol.Optional(ATTR_TOP_N, default=25): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+        vol.Optional(ATTR_TRACEMALLOC, default=False): cv.boolean,
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+RECORD_TRAFFIC_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_DURATION, default=600): vol.All(vol.Coerce(int), vol.Range(min=10, max=86400)),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+def _get_portainer_servers(hass: HomeAssistant) -> List[PortainerServer]:
+    """Return the PortainerServer of every loaded Porthole config entry."""
+    return [
+        entry.portainer
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if getattr(entry, "portainer", None) is not None
+    ]
+
+
+def _find_container(hass: HomeAssistant, container: str, endpoint_id: Optional[int]) -> Tuple[PortainerServer, Dict[str, Any]]:
+    """Resolve a container name, ID or unique ID prefix to its PortainerServer and container record."""
+    name_matches, id_matches = [], []
+    for portainer in _get_portainer_servers(hass):
+        server_name_matches, server_id_matches = portainer.match_containers(container, endpoint_id)
+        name_matches.extend((portainer, container_info) for container_info in server_name_matches)
+        id_matches.extend((portainer, container_info) for container_info in server_id_matches)
+    try:
+        match = select_container(container, name_matches, id_matches)
+    except ValueError as e:
+        raise HomeAssistantError(f"[Porthole] {e}") from e
+    if match is None:
+        raise HomeAssistantError(f"[Porthole] Container '{container}' not found.")
+    return match
+
+
+def _find_endpoint(hass: HomeAssistant, endpoint_id: int) -> PortainerServer:
+    """Resolve an endpoint ID to the PortainerServer monitoring it."""
+    for portainer in _get_portainer_servers(hass):
+        if endpoint_id in portainer.portainer_obj.get("endpoint_ids", []):
+            return portainer
+    raise HomeAssistantError(f"[Porthole] Endpoint {endpoint_id} not found.")
+
+
+def _resolve_config_path(config_dir: str, filename: str) -> str:
+    """Resolve a filename relative to the config directory, refusing paths outside of it (runs in the executor)."""
+    config_dir = os.path.realpath(config_dir)
+    path = os.path.realpath(os.path.join(config_dir, filename))
+    if os.path.commonpath((config_dir, path)) != config_dir or path == config_dir:
+        raise HomeAssistantError(f"[Porthole] Writing to '{filename}' is not allowed, the file must be inside the config directory.")
+    return path
+
+
+def _write_text_file(path: str, text: str) -> None:
+    """Write a text file (runs in the executor)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as text_file:
+        text_file.write(text)
+
+
+def _write_log_file(path: str, result: Dict[str, Any]) -> None:
+    """Write fetched log lines to a file (runs in the executor)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as log_file:
+        for line in result["lines"]:
+            log_file.write(f'[{line["stream"]}] {line["message"]}\n')
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Porthole services."""
+
+    async def async_fetch_logs(call: ServiceCall) -> Optional[Dict[str, Any]]:
+        """Handle the fetch_logs service call."""
+        portainer, container_info = _find_container(hass, call.data[ATTR_CONTAINER], call.data.get(ATTR_ENDPOINT_ID))
+
+        # Refuse a bad filename before downloading anything
+        path = None
+        if call.data.get(ATTR_FILENAME):
+            path = await hass.async_add_executor_job(_resolve_config_path, hass.config.config_dir, call.data[ATTR_FILENAME])
+
+        try:
+            result = await portainer.fetch_logs(
+                container_info["endpoint_id"],
+                container_info["container_id"],
+                tail=None if call.data[ATTR_TAIL] == "all" else call.data[ATTR_TAIL],
+                since=call.data.get(ATTR_SINCE),
+                max_lines=call.data[ATTR_MAX_LINES],
+                max_bytes=call.data[ATTR_MAX_BYTES],
+            )
+        except Exception as e:
+            raise HomeAssistantError(f"[Porthole] Failed to fetch logs for container '{container_info['container_id']}': {e}") from e
+
+        if path is not None:
+            await hass.async_add_executor_job(_write_log_file, path, result)
+            _LOGGER.info(f"[Porthole] Wrote {result['line_count']} log lines to {path}.")
+
+        if call.return_response:
+            return result
+        return None
+
+    async def async_get_container_details(call: ServiceCall) -> Dict[str, Any]:
+        """Handle the get_container_details service call."""
+        portainer, container_info = _find_container(hass, call.data[ATTR_CONTAINER], call.data.get(ATTR_ENDPOINT_ID))
+
+        try:
+            details = await portainer.get_container_details(container_info["endpoint_id"], container_info["container_id"])
+        except Exception as e:
+            raise HomeAssistantError(f"[Porthole] Failed to inspect container '{container_info['container_id']}': {e}") from e
+
+        return {"endpoint_id": container_info["endpoint_id"], "container_id": container_info["container_id"], **details}
+
+    async def async_pause_endpoint(call: ServiceCall) -> None:
+        """Handle the pause_endpoint service call."""
+        _find_endpoint(hass, call.data[ATTR_ENDPOINT_ID]).pause_endpoint(call.data[ATTR_ENDPOINT_ID])
+
+    async def async_resume_endpoint(call: ServiceCall) -> None:
+        """Handle the resume_endpoint service call."""
+        portainer = _find_endpoint(hass, call.data[ATTR_ENDPOINT_ID])
+        portainer.resume_endpoint(call.data[ATTR_ENDPOINT_ID])
+        # Catch up right away instead of serving the paused state until the next poll
+        hass.async_create_task(portainer.update(no_throttle=True))
+
+    async def async_profile(call: ServiceCall) -> Optional[Dict[str, Any]]:
+        """Handle the profile service call: profile the next poll cycles of each Portainer server."""
+        entries = [
+            entry
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if getattr(entry, "portainer", None) is not None and call.data.get(ATTR_ENTRY_ID) in (None, entry.entry_id)
+        ]
+        if not entries:
+            raise HomeAssistantError("[Porthole] No Portainer server to profile.")
+
+        # Reject a file outside the config directory before spending the poll cycles
+        path = None
+        if call.data.get(ATTR_FILENAME) or not call.return_response:
+            filename = call.data.get(ATTR_FILENAME) or f"porthole_profile_{int(time.time())}.txt"
+            path = await hass.async_add_executor_job(_resolve_config_path, hass.config.config_dir, filename)
+
+        reports = {}
+        texts = []
+        entity_registry = er.async_get(hass)
+        for entry in entries:
+            portainer = entry.portainer
+            if portainer.profiler is not None:
+                raise HomeAssistantError(f"[Porthole] A profile of {entry.title} is already running.")
+
+            profiler = PollProfiler(call.data[ATTR_CYCLES], call.data[ATTR_TOP_N], call.data[ATTR_TRACEMALLOC])
+            portainer.profiler = profiler
+            entity_ids = [
+                entity_entry.entity_id
+                for entity_entry in er.async_entries_for_config_entry(entity_registry, entry.entry_id)
+                if entity_entry.disabled_by is None and hass.states.get(entity_entry.entity_id) is not None
+            ]
+            try:
+                while not profiler.finished:
+                    await portainer.update(no_throttle=True)
+                    # Writing the states of this entry's entities is part of what a poll costs
+                    with profiler.phase("state_writes"):
+                        for entity_id in entity_ids:
+                            await async_update_entity(hass, entity_id)
+            finally:
+                portainer.profiler = None
+
+            reports[entry.entry_id] = profiler.report()
+            texts.append(f"{entry.title}\n{profiler.report_text()}")
+
+        if path is not None:
+            await hass.async_add_executor_job(_write_text_file, path, "\n".join(texts))
+            _LOGGER.info(f"[Porthole] Wrote poll profile to {path}.")
+
+        if call.return_response:
+            return {"reports": reports}
+        return None
+
+    async def async_record_traffic(call: ServiceCall) -> Optional[Dict[str, Any]]:
+        """Handle the record_traffic service call: record the API responses of each Portainer server for a while."""
+        entries = [
+            entry
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if getattr(entry, "portainer", None) is not None and call.data.get(ATTR_ENTRY_ID) in (None, entry.entry_id)
+        ]
+        if not entries:
+            raise HomeAssistantError("[Porthole] No Portainer server to record.")
+
+        filename = call.data.get(ATTR_FILENAME) or f"porthole_traffic_{int(time.time())}.jsonl"
+        root, ext = os.path.splitext(filename)
+        files = {}
+        # Check every server and file first, so a refused call starts no recording at all
+        for entry in entries:
+            if entry.portainer.recorder is not None:
+                raise HomeAssistantError(f"[Porthole] A recording of {entry.title} is already running.")
+            files[entry.entry_id] = await hass.async_add_executor_job(
+                _resolve_config_path, hass.config.config_dir, f"{root}_{entry.entry_id}{ext}" if len(entries) > 1 else filename
+            )
+
+        for entry in entries:
+            portainer = entry.portainer
+            path = files[entry.entry_id]
+            await hass.async_add_executor_job(os.makedirs, os.path.dirname(path), 0o755, True)
+
+            recorder = portainer.recorder = TrafficRecorder(path)
+            recorder.start()
+            _LOGGER.info(f"[Porthole] Recording API traffic of {entry.title} to {path} for {call.data[ATTR_DURATION]} s.")
+
+            async def _stop_recording(_now=None, portainer=portainer, recorder=recorder) -> None:
+                if portainer.recorder is recorder:
+                    portainer.recorder = None
+                    await recorder.async_stop()
+                    _LOGGER.info(f"[Porthole] Recorded {recorder.responses} API responses to {recorder.path}.")
+
+            # Unloading the entry ends the recording early, the server may outlive the entry in the reload cache
+            cancel_stop = async_call_later(hass, call.data[ATTR_DURATION], _stop_recording)
+            entry.async_on_unload(cancel_stop)
+            entry.async_on_unload(_stop_recording)
+
+        if call.return_response:
+            return {"files": files}
+        return None
+
+    if not hass.services.has_service(DOMAIN, SERVICE_FETCH_LOGS):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_FETCH_LOGS,
+            async_fetch_logs,
+            schema=FETCH_LOGS_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_GET_CONTAINER_DETAILS):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_GET_CONTAINER_DETAILS,
+            async_get_container_details,
+            schema=GET_CONTAINER_DETAILS_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_PAUSE_ENDPOINT):
+        hass.services.async_register(DOMAIN, SERVICE_PAUSE_ENDPOINT, async_pause_endpoint, schema=ENDPOINT_SCHEMA)
+
+    if not hass.services.has_service(DOMAIN, SERVICE_RESUME_ENDPOINT):
+        hass.services.async_register(DOMAIN, SERVICE_RESUME_ENDPOINT, async_resume_endpoint, schema=ENDPOINT_SCHEMA)
+
+    if not hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_PROFILE,
+            async_profile,
+            schema=PROFILE_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_RECORD_TRAFFIC):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_RECORD_TRAFFIC,
+            async_record_traffic,
+            schema=RECORD_TRAFFIC_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
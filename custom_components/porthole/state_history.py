@@ -0,0 +1,202 @@
+import logging
+import re
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Docker container states, stored as one byte per transition
+STATES = ("created", "running", "paused", "restarting", "removing", "exited", "dead")
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+UNKNOWN_STATE_CODE = 255
+RUNNING_CODE = STATE_CODES["running"]
+RESTARTING_CODE = STATE_CODES["restarting"]
+
+# Docker's humanized uptime in the container Status, e.g. "Up 3 hours (healthy)"
+_UPTIME = re.compile(r"^Up (?:(Less than a second)|About an? (minute|hour)|(\d+) (second|minute|hour|day|week|month|year)s?)\b")
+UPTIME_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400}
+
+
+def parse_uptime(status: str) -> Optional[float]:
+    """Return the uptime in seconds from a container Status, None when it is not up.
+
+    Docker rounds the uptime into ever coarser units, but never down across units, so the
+    value only decreases when the container was restarted.
+    """
+    match = _UPTIME.match(status or "")
+    if match is None:
+        return None
+    less_than_a_second, about_unit, count, unit = match.groups()
+    if less_than_a_second:
+        return 0.0
+    if about_unit:
+        return float(UPTIME_UNITS[about_unit])
+    return float(int(count) * UPTIME_UNITS[unit])
+
+
+class _TransitionRing:
+    """Fixed-size ring of (timestamp, state code) pairs kept in two flat arrays."""
+
+    __slots__ = ("times", "states", "head", "count")
+
+    def __init__(self, size: int) -> None:
+        self.times = array("d", bytes(8 * size))
+        self.states = array("B", bytes(size))
+        self.head = 0  # Next slot to write
+        self.count = 0
+
+    def append(self, timestamp: float, state_code: int) -> None:
+        self.times[self.head] = timestamp
+        self.states[self.head] = state_code
+        self.head = (self.head + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def newest_first(self) -> Iterator[Tuple[float, int]]:
+        size = len(self.times)
+        for offset in range(1, self.count + 1):
+            slot = (self.head - offset) % size
+            yield self.times[slot], self.states[slot]
+
+
+class ContainerStateHistory:
+    """In-memory history of container state transitions, a fixed-size ring per container.
+
+    Containers are keyed by endpoint ID and name rather than container ID, so a container
+    recreated with a new ID keeps its history. Restarts that happen between two polls leave the
+    state at running; they are recovered from the uptime and from Docker's RestartCount.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._size: int = size
+        self._rings: Dict[str, _TransitionRing] = {}
+        self._uptimes: Dict[str, float] = {}  # Last uptime seen, 0 while not running
+        self._restart_counts: Dict[str, List[int]] = {}  # Last RestartCount seen, restarts recorded since
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    @staticmethod
+    def key(endpoint_id: int, container_name: str) -> str:
+        """Return the history key of a container."""
+        return f"{endpoint_id}/{container_name}"
+
+    def record(self, key: str, state: str, timestamp: Optional[float] = None) -> bool:
+        """Record the observed state, returns True when it is a transition."""
+        state_code = STATE_CODES.get(state, UNKNOWN_STATE_CODE)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = _TransitionRing(self._size)
+        elif ring.states[(ring.head - 1) % self._size] == state_code:
+            return False
+        elif state_code == RUNNING_CODE:
+            self._count_restart(key)
+        ring.append(time.time() if timestamp is None else timestamp, state_code)
+        return True
+
+    def record_restart(self, key: str, timestamp: Optional[float] = None) -> None:
+        """Record a restart no poll saw, as a pass through restarting back into the current state."""
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = _TransitionRing(self._size)
+        timestamp = time.time() if timestamp is None else timestamp
+        current_code = RUNNING_CODE
+        if ring.count:
+            last = (ring.head - 1) % self._size
+            timestamp = max(timestamp, ring.times[last])  # Keep the ring in order
+            current_code = ring.states[last]
+        ring.append(timestamp, RESTARTING_CODE)
+        ring.append(timestamp, RUNNING_CODE)
+        if current_code != RUNNING_CODE:
+            # Restarted, then went down again
+            ring.append(timestamp, current_code)
+        self._count_restart(key)
+
+    def _count_restart(self, key: str) -> None:
+        """Count a recorded restart against the next RestartCount observation."""
+        restart_count = self._restart_counts.get(key)
+        if restart_count is not None:
+            restart_count[1] += 1
+
+    def observe_uptime(self, key: str, uptime: Optional[float], now: Optional[float] = None) -> bool:
+        """Track the uptime of a running container (None when it is not), returns True when it reveals a restart."""
+        previous = self._uptimes.get(key)
+        # Reset in place rather than removed, containers come and go from running all the time
+        self._uptimes[key] = uptime or 0.0
+        if uptime is None or previous is None or uptime >= previous:
+            return False
+        self.record_restart(key, (time.time() if now is None else now) - uptime)
+        return True
+
+    def observe_restart_count(self, key: str, restart_count: int, timestamp: Optional[float] = None) -> int:
+        """Track Docker's RestartCount, recording the restarts it counted that were not seen otherwise."""
+        previous = self._restart_counts.get(key)
+        missed = 0
+        if previous is not None and restart_count > previous[0]:
+            # Restarts already recorded from transitions or the uptime since the last count are not missed
+            missed = min(restart_count - previous[0] - previous[1], self._size // 2)
+            for _ in range(missed):
+                self.record_restart(key, timestamp)
+        self._restart_counts[key] = [restart_count, 0]
+        return max(missed, 0)
+
+    def prune(self, live_keys: Iterable[str]) -> None:
+        """Forget the containers that no longer exist."""
+        live_keys = set(live_keys)
+        for key in [key for key in self._rings if key not in live_keys]:
+            del self._rings[key]
+        for tracked in (self._uptimes, self._restart_counts):
+            for key in [key for key in tracked if key not in live_keys]:
+                del tracked[key]
+
+    def state_since(self, key: str) -> Optional[float]:
+        """Return when the container entered its current state."""
+        ring = self._rings.get(key)
+        if ring is None or ring.count == 0:
+            return None
+        return ring.times[(ring.head - 1) % self._size]
+
+    def restart_count(self, key: str, window: float, now: Optional[float] = None) -> int:
+        """Count the transitions back into running within the window."""
+        since = (time.time() if now is None else now) - window
+        restarts = 0
+        newer_state = None
+        for timestamp, state_code in self._transitions(key):
+            if newer_state == RUNNING_CODE and state_code != RUNNING_CODE:
+                restarts += 1
+            if timestamp < since:
+                break
+            newer_state = state_code
+        return restarts
+
+    def transition_count(self, key: str, window: float, now: Optional[float] = None) -> int:
+        """Count the state transitions within the window (the first observation is not one)."""
+        since = (time.time() if now is None else now) - window
+        transitions = 0
+        newer_seen = False
+        for timestamp, _ in self._transitions(key):
+            if newer_seen:
+                transitions += 1
+            if timestamp < since:
+                break
+            newer_seen = True
+        return transitions
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Return a JSON serialisable copy, oldest transition first."""
+        data = {}
+        for key, ring in self._rings.items():
+            transitions = list(ring.newest_first())[::-1]
+            data[key] = {"t": [timestamp for timestamp, _ in transitions], "s": [state_code for _, state_code in transitions]}
+        return data
+
+    def load(self, data: Dict[str, Dict[str, Any]]) -> None:
+        """Restore rings saved with as_dict()."""
+        for key, transitions in data.items():
+            ring = self._rings[key] = _TransitionRing(self._size)
+            for timestamp, state_code in list(zip(transitions["t"], transitions["s"]))[-self._size:]:
+                ring.append(timestamp, state_code)
+
+    def _transitions(self, key: str) -> Iterator[Tuple[float, int]]:
+        ring = self._rings.get(key)
+        return ring.newest_first() if ring is not None else iter(())
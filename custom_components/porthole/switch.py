@@ -12,6 +12,7 @@ from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.util import Throttle
 
+from .entity_sync import async_setup_entity_sync
 from .portainer_server import PortainerServer
 from .switches.portainer_container_switch import PortainerContainerSwitch
 
@@ -24,28 +25,15 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _LOGGER.info("Setting up Portainer integration with config entry.")
 
     portainer = entry.portainer
-        
-    try:
-        # Add endpoint switches and container switches for each endpoint
-        for endpoint_index in range(0, portainer.portainer_obj["measured_num_endpoints"]):
-            endpoint_id = portainer.portainer_obj["endpoint_ids"][endpoint_index]
 
-            try:
-                # Create container switches associated with the device
-                container_switches = [
-                    PortainerContainerSwitch(portainer, endpoint_index, container_index)
-                    for container_index in range(0, portainer.portainer_obj["endpoints"][endpoint_index]["measured_num_containers"])
-                ]
-                # Now, add them all at once
-                async_add_entities(container_switches, update_before_add=True)
+    def _create_entities(key):
+        """Create the switch of a container, nothing else has switches."""
+        if key[0] == "container":
+            return [PortainerContainerSwitch(portainer, key[1], key[2])]
+        return []
 
-            except Exception as e:
-                _LOGGER.error(f"Error adding Portainer Container Switches: {e}")
-                return False
-        
-    except Exception as e:
-        _LOGGER.error(f"Error adding Portainer switches: {e}")
-        return False
+    # Container switches of all endpoints are added in one batch, then follow the snapshot
+    async_setup_entity_sync(hass, entry, async_add_entities, _create_entities)
 
     return True
 
@@ -8,60 +8,51 @@ from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.util import Throttle
 
+from ..entity import PortainerContainerEntity
 from ..portainer_server import PortainerServer
 
 _LOGGER = logging.getLogger(__name__)
 
-class PortainerContainerSwitch(SwitchEntity):
+class PortainerContainerSwitch(PortainerContainerEntity, SwitchEntity):
 
-    def __init__(self, portainer, endpoint_index, container_index):
-        self._portainer = portainer
-        self._portainer_obj = self._portainer.portainer_obj
-        self._endpoint_index = endpoint_index
-        self._container_index = container_index
-        self._state = "on" if (self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["state"] == "running") else "off"
+    _attr_should_poll = False  # See PortainerContainerSensor
+
+    def __init__(self, portainer, endpoint_id, container_stem):
+        super().__init__(portainer, endpoint_id, container_stem)
+        container_info = self._container_info
+        self._unique_id = container_info["container_switch_unique_id"]
+        self._name = container_info["container_switch_name"]
 
-        self._endpoint_id = self._portainer_obj["endpoints"][self._endpoint_index]["endpoint_id"]
-        self._container_id = self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_id"]
-        self._name = self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_switch_name"]
-        
     @property
     def unique_id(self):
         """Return a unique ID for the entity, based on container name."""
-        _LOGGER.debug(self._container_index)
-        return self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_switch_unique_id"]
+        return self._unique_id
 
     @property
     def name(self):
         """Return the name of the entity."""
-        return self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["container_switch_name"]
-
-    @property
-    def state(self):
-        """Return the current state of the container (status)."""
-        # Use the "Status" field from Portainer to represent the state
-        return self._state
+        return self._name
 
     @property
     def is_on(self) -> bool:
-        """Return true if the switch is on."""
-        return self._state == "on"
+        """Return true if the container is running."""
+        container_info = self._container_info
+        return container_info is not None and container_info["state"] == "running"
 
-    def turn_on(self, **kwargs) -> None:
+    async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
         _LOGGER.info(f"Turning on the switch: {self._name}")
-        response = self._portainer.start_container(self._endpoint_id, self._container_id, self._endpoint_index, self._container_index)
-        if (response):
-            self._state = "on" if (self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["state"] == "running") else "off"
-            self.schedule_update_ha_state()
+        container_info = self._container_info
+        # The container ID is read at call time, a recreated container keeps its stem but not its ID
+        if container_info is not None and await self._portainer.start_container(self._endpoint_id, container_info["container_id"], self._stem):
+            self.async_write_ha_state()
 
-    def turn_off(self, **kwargs) -> None:
+    async def async_turn_off(self, **kwargs) -> None:
         """Turn the switch off."""
         _LOGGER.info(f"Turning off the switch: {self._name}")
-        response = self._portainer.stop_container(self._endpoint_id, self._container_id, self._endpoint_index, self._container_index)
-        if (response):
-            self._state = "on" if (self._portainer_obj["endpoints"][self._endpoint_index]["containers"][self._container_index]["state"] == "running") else "off"
-            self.schedule_update_ha_state()
+        container_info = self._container_info
+        if container_info is not None and await self._portainer.stop_container(self._endpoint_id, container_info["container_id"], self._stem):
+            self.async_write_ha_state()
 
     @property
     def icon(self):
@@ -71,8 +62,8 @@ class PortainerContainerSwitch(SwitchEntity):
     @property
     def extra_state_attributes(self):
         """Return additional state attributes."""
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        container_info = endpoint_info["containers"][self._container_index]
+        endpoint_info = self._portainer.get_endpoint(self._endpoint_id)
+        container_info = self._container_info
 
         return {
             "Name": container_info["name"],
@@ -89,19 +80,7 @@ class PortainerContainerSwitch(SwitchEntity):
             "Version": self._portainer_obj["portainer_version"],
         }
 
-    @property
-    def device_info(self):
-        """Return device specific attributes."""
-        # Device unique identifier is the serial
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        return {
-            "identifiers": {(f"portainer_{self._portainer_obj["portainer_id"]}", endpoint_info["endpoint_id"])},
-            "name": endpoint_info["name"],
-            "manufacturer": "Portainer"
-            }
-
     async def async_update(self):
         """Update the server's state and attributes."""
-        endpoint_info = self._portainer_obj["endpoints"][self._endpoint_index]
-        _LOGGER.debug(f"Updating Portainer Container sensor: {endpoint_info["endpoint_id"]}")
+        _LOGGER.debug(f"Updating Portainer Container sensor: {self._endpoint_id}")
         await self._portainer.update()
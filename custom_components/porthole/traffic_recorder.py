@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+REDACTED = "**REDACTED**"
+
+# Responses waiting for the writer, the ones beyond are dropped rather than slowing the requests down
+RECORDER_MAX_QUEUED = 1000
+
+# Scalar values under keys containing one of these are redacted
+SECRET_KEY_PARTS = ("password", "passwd", "secret", "token", "jwt", "apikey", "api_key", "privatekey", "private_key", "credential", "auth", "cert")
+
+
+def sanitize(data: Any) -> Any:
+    """Return a copy of decoded JSON with secrets redacted, keeping its shape and sizes realistic."""
+    if isinstance(data, dict):
+        sanitized = {}
+        for key, value in data.items():
+            if key == "Env" and isinstance(value, list):
+                # Names are kept, values regularly hold secrets
+                sanitized[key] = [f'{env.split("=", 1)[0]}={REDACTED}' if isinstance(env, str) else env for env in value]
+            elif isinstance(value, str) and any(part in key.lower() for part in SECRET_KEY_PARTS):
+                sanitized[key] = REDACTED
+            else:
+                sanitized[key] = sanitize(value)
+        return sanitized
+    if isinstance(data, list):
+        return [sanitize(value) for value in data]
+    return data
+
+
+class TrafficRecorder:
+    """Append sanitized Portainer API responses and their timing to a JSON lines file.
+
+    Every line holds the request (path, params), when it started relative to the start of the
+    recording, how long the response took, its status and the sanitized body, so
+    scripts/replay_portainer.py can serve it back. Requests only queue their response, a
+    background writer sanitizes and writes them in the executor.
+    """
+
+    def __init__(self, path: str, max_queued: int = RECORDER_MAX_QUEUED) -> None:
+        self.path: str = path
+        self.responses: int = 0
+        self.dropped: int = 0
+        self._started: float = time.monotonic()
+        self._queue: asyncio.Queue = asyncio.Queue(max_queued)
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background writer."""
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._run())
+
+    async def async_stop(self) -> None:
+        """Write what is still queued and stop the writer."""
+        if self._writer is None:
+            return
+        await self._queue.put(None)
+        await self._writer
+        if self.dropped:
+            _LOGGER.warning(f"Dropped {self.dropped} API responses the writer of {self.path} could not keep up with.")
+
+    def record(self, path: str, params: Optional[Dict[str, str]], status: int, body: bytes, elapsed: float) -> None:
+        """Queue a response for the writer, never waiting on it."""
+        offset = time.monotonic() - self._started - elapsed
+        try:
+            self._queue.put_nowait((offset, path, params, status, body, elapsed))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self.responses += 1
+
+    async def _run(self) -> None:
+        """Write the queued responses in batches until async_stop() queues the end marker."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stopping = batch[-1] is None
+            responses = [response for response in batch if response is not None]
+            if not responses:
+                continue
+            try:
+                await loop.run_in_executor(None, self._write, responses)
+            except Exception as e:
+                _LOGGER.error(f"Failed to write API responses to {self.path}: {e}")
+
+    def _write(self, responses: List[Tuple[float, str, Optional[Dict[str, str]], int, bytes, float]]) -> None:
+        lines = []
+        for offset, path, params, status, body, elapsed in responses:
+            entry = {
+                "offset": round(offset, 6),
+                "elapsed": round(elapsed, 6),
+                "path": path,
+                "params": params or {},
+                "status": status,
+            }
+            try:
+                entry["body"] = sanitize(json.loads(body))
+            except ValueError:
+                # Not JSON, there is nothing to sanitize in what Porthole reads this way
+                entry["body_base64"] = base64.b64encode(body).decode("ascii")
+            lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+
+        with open(self.path, "a", encoding="utf-8") as traffic_file:
+            traffic_file.writelines(lines)
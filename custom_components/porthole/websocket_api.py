@@ -0,0 +1,152 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_SNAPSHOT_UPDATED
+from .portainer_server import PortainerServer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Column order of the compact container table
+COLUMNS = ("entry_id", "endpoint_id", "endpoint_name", "container_id", "name", "state", "status", "image", "created", "ports")
+KEY_COLUMN = COLUMNS.index("container_id")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+FILTER_SCHEMA = {
+    vol.Optional("entry_id"): str,
+    vol.Optional("endpoint_id"): vol.Coerce(int),
+    vol.Optional("state"): vol.All(vol.Any(str, [str])),
+    vol.Optional("search"): str,
+}
+
+
+def _get_portainer_servers(hass: HomeAssistant, entry_id: Optional[str]) -> List[Tuple[str, PortainerServer]]:
+    """Return (entry_id, PortainerServer) for the loaded config entries, optionally only one."""
+    return [
+        (entry.entry_id, entry.portainer)
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if getattr(entry, "portainer", None) is not None and entry_id in (None, entry.entry_id)
+    ]
+
+
+def _iter_rows(entry_id: str, portainer: PortainerServer) -> Iterator[Tuple[Any, ...]]:
+    """Yield one row per container straight from the in-memory snapshot."""
+    for endpoint_info in portainer.portainer_obj.get("endpoints", []):
+        for container_name, container_info in zip(endpoint_info["container_names"], endpoint_info["containers"]):
+            yield (
+                entry_id,
+                endpoint_info["endpoint_id"],
+                endpoint_info["name"],
+                container_info["container_id"],
+                container_name,
+                container_info["state"],
+                container_info["status"],
+                container_info["image"],
+                container_info["created"],
+                container_info["ports"],
+            )
+
+
+def _filtered_rows(hass: HomeAssistant, msg: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    """Return the rows matching the filters of a WebSocket message."""
+    endpoint_id = msg.get("endpoint_id")
+    states = msg.get("state")
+    if isinstance(states, str):
+        states = [states]
+    search = msg.get("search", "").lower()
+
+    rows = []
+    for entry_id, portainer in _get_portainer_servers(hass, msg.get("entry_id")):
+        for row in _iter_rows(entry_id, portainer):
+            if endpoint_id is not None and row[1] != endpoint_id:
+                continue
+            if states and row[5] not in states:
+                continue
+            if search and search not in row[4].lower() and search not in row[7].lower():
+                continue
+            rows.append(row)
+    return rows
+
+
+def _to_columns(rows: List[Tuple[Any, ...]]) -> Dict[str, List[Any]]:
+    """Turn rows into one list per column, which serialises far smaller than a list of dicts."""
+    if not rows:
+        return {column: [] for column in COLUMNS}
+    return dict(zip(COLUMNS, (list(values) for values in zip(*rows))))
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "porthole/containers/list",
+        **FILTER_SCHEMA,
+        vol.Optional("offset", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("limit", default=DEFAULT_PAGE_SIZE): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_PAGE_SIZE)),
+    }
+)
+@callback
+def ws_list_containers(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    """Return one page of the filtered container table."""
+    rows = _filtered_rows(hass, msg)
+    offset = msg["offset"]
+    connection.send_result(
+        msg["id"],
+        {
+            "columns": _to_columns(rows[offset:offset + msg["limit"]]),
+            "offset": offset,
+            "total": len(rows),
+        },
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "porthole/containers/subscribe",
+        **FILTER_SCHEMA,
+    }
+)
+@callback
+def ws_subscribe_containers(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    """Send the filtered container table, then only the rows that changed after each poll, setup or unload."""
+    previous: Dict[str, Tuple[Any, ...]] = {row[KEY_COLUMN]: row for row in _filtered_rows(hass, msg)}
+
+    @callback
+    def _async_on_update(entry_id: str) -> None:
+        nonlocal previous
+        if msg.get("entry_id") not in (None, entry_id):
+            return
+        current = {row[KEY_COLUMN]: row for row in _filtered_rows(hass, msg)}
+        added = [row for key, row in current.items() if key not in previous]
+        changed = [row for key, row in current.items() if key in previous and previous[key] != row]
+        removed = [key for key in previous if key not in current]
+        previous = current
+        if added or changed or removed:
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"],
+                    {"added": _to_columns(added), "changed": _to_columns(changed), "removed": removed},
+                )
+            )
+
+    # The signal covers entries set up, reloaded or unloaded after the subscription too
+    connection.subscriptions[msg["id"]] = async_dispatcher_connect(hass, SIGNAL_SNAPSHOT_UPDATED, _async_on_update)
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"],
+            {"columns": _to_columns(list(previous.values())), "total": len(previous)},
+        )
+    )
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the Porthole WebSocket commands."""
+    websocket_api.async_register_command(hass, ws_list_containers)
+    websocket_api.async_register_command(hass, ws_subscribe_containers)
@@ -0,0 +1,249 @@
+"""Memory-footprint regression check for the in-memory Portainer model.
+
+Loads synthetic fleets into PortainerServer and the entity classes, runs a number of
+poll cycles and measures the retained memory with tracemalloc. Fails when the footprint
+or the growth across polls exceeds the stored baselines, when the polls keep growing
+whatever the baseline says, or when close() leaves memory behind.
+
+Needs Home Assistant installed (the entity classes import it), run from the repository root:
+
+    python scripts/memory_footprint.py
+    python scripts/memory_footprint.py --sizes 100 1000 --polls 10
+    python scripts/memory_footprint.py --update-baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from custom_components.porthole.portainer_server import PortainerServer, PRIORITY_POLL  # noqa: E402
+from custom_components.porthole.sensors.portainer_server_sensor import PortainerServerSensor  # noqa: E402
+from custom_components.porthole.sensors.portainer_endpoint_sensor import PortainerEndpointSensor  # noqa: E402
+from custom_components.porthole.sensors.portainer_container_sensor import PortainerContainerSensor  # noqa: E402
+from custom_components.porthole.sensors.portainer_container_history_sensor import (  # noqa: E402
+    PortainerContainerHistorySensor, HISTORY_SENSOR_KINDS,
+)
+from custom_components.porthole.switches.portainer_container_switch import PortainerContainerSwitch  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_baseline.json")
+DEFAULT_SIZES = [100, 1000, 10000]
+CONTAINERS_PER_ENDPOINT = 100
+DEFAULT_POLLS = 5
+DEFAULT_TOLERANCE = 0.15  # Allowed footprint above the baseline
+GROWTH_FLOOR = 64 * 1024  # Growth below this is noise (interned strings, dict resizes)
+GROWTH_LIMIT = 256 * 1024  # Growth across polls above this is a leak, even if the baseline has it
+LEFTOVER_LIMIT = 256 * 1024  # Memory close() may leave behind (caches of the imported modules)
+
+
+class SyntheticFleet:
+    """Endpoints and containers as Portainer would report them, the poll bodies encoded up front.
+
+    Every poll flips the state of a different slice of the containers, so the transforms and the
+    state history run on every cycle. Encoding all bodies before tracing keeps them out of the numbers.
+    """
+
+    def __init__(self, num_containers: int, polls: int) -> None:
+        num_endpoints = max(1, num_containers // CONTAINERS_PER_ENDPOINT)
+        self.endpoints = [self._endpoint(endpoint_id, min(CONTAINERS_PER_ENDPOINT, num_containers)) for endpoint_id in range(1, num_endpoints + 1)]
+        self.endpoints_body = json.dumps(self.endpoints).encode()
+        self.status_body = json.dumps({"InstanceID": "synthetic", "Version": "2.21.0"}).encode()
+        self.poll = 0
+        self.bodies: List[Dict[int, bytes]] = []
+        for poll in range(polls):
+            self.bodies.append({
+                endpoint["Id"]: json.dumps([
+                    self._container(endpoint["Id"], index, "exited" if poll and index % polls == poll else "running")
+                    for index in range(endpoint["Snapshots"][0]["ContainerCount"])
+                ]).encode()
+                for endpoint in self.endpoints
+            })
+
+    @staticmethod
+    def _endpoint(endpoint_id: int, num_containers: int) -> Dict[str, Any]:
+        return {
+            "Id": endpoint_id,
+            "Name": f"endpoint-{endpoint_id}",
+            "URL": f"tcp://10.0.{endpoint_id // 256}.{endpoint_id % 256}:9001",
+            "Snapshots": [{
+                "TotalCPU": 8, "TotalMemory": 16 * 1024 ** 3, "ContainerCount": num_containers,
+                "RunningContainerCount": num_containers, "StoppedContainerCount": 0,
+                "HealthyContainerCount": 0, "UnhealthyContainerCount": 0,
+                "VolumeCount": 10, "ImageCount": 20, "Swarm": False,
+            }],
+        }
+
+    @staticmethod
+    def _container(endpoint_id: int, index: int, state: str) -> Dict[str, Any]:
+        return {
+            "Id": f"{endpoint_id:016x}{index:048x}",
+            "Names": [f"/service-{index:04d}"],
+            "Image": f"registry.example.com/team/service-{index % 50}:1.{index % 7}",
+            "ImageID": f"sha256:{index % 50:064x}",
+            "Created": 1700000000 + index,
+            "State": state,
+            "Status": "Up 3 hours" if state == "running" else "Exited (0) 1 minute ago",
+            "Labels": {"com.docker.compose.project": f"stack-{index % 10}", "maintainer": "ops"},
+            "Ports": [{"IP": "0.0.0.0", "PrivatePort": 8080, "PublicPort": 20000 + index, "Type": "tcp"}],
+        }
+
+    def respond(self, path: str, endpoint_id: Any) -> bytes:
+        if path == "/api/status":
+            return self.status_body
+        if path == "/api/endpoints":
+            return self.endpoints_body
+        return self.bodies[self.poll][endpoint_id]
+
+
+class SyntheticPortainerServer(PortainerServer):
+    """PortainerServer answering from a SyntheticFleet, the pooled session and scheduler still in use."""
+
+    def __init__(self, fleet: SyntheticFleet) -> None:
+        super().__init__("http://portainer.invalid:9000", "admin", "synthetic")
+        self._fleet = fleet
+
+    async def _get_jwt(self):
+        return "synthetic"
+
+    async def _get_bytes(self, path, endpoint_id=None, priority=PRIORITY_POLL, params=None):
+        await self._get_session()
+        async with self.scheduler.slot(endpoint_id, priority):
+            return self._fleet.respond(path, endpoint_id)
+
+
+def build_entities(portainer: PortainerServer) -> List[Any]:
+    """Create the entities sensor.py and switch.py would create for the snapshot."""
+    entities: List[Any] = [PortainerServerSensor(portainer)]
+    for endpoint_info in portainer.portainer_obj["endpoints"]:
+        endpoint_id = endpoint_info["endpoint_id"]
+        entities.append(PortainerEndpointSensor(portainer, endpoint_id))
+        for container_stem in endpoint_info["containers_by_stem"]:
+            entities.append(PortainerContainerSensor(portainer, endpoint_id, container_stem))
+            entities.append(PortainerContainerSwitch(portainer, endpoint_id, container_stem))
+            entities.extend(PortainerContainerHistorySensor(portainer, endpoint_id, container_stem, kind) for kind in HISTORY_SENSOR_KINDS)
+    return entities
+
+
+def write_states(entities: List[Any]) -> None:
+    """Read what Home Assistant reads when writing the states, results discarded."""
+    for entity in entities:
+        entity.unique_id, entity.name, entity.state, entity.extra_state_attributes  # noqa: B018
+
+
+def retained() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def measure(num_containers: int, polls: int) -> Dict[str, Any]:
+    """Return the retained memory after the first poll and the growth over the following polls."""
+    fleet = SyntheticFleet(num_containers, polls)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = retained()
+        portainer = SyntheticPortainerServer(fleet)
+        await portainer.update(no_throttle=True)
+        entities = build_entities(portainer)
+        write_states(entities)
+        footprint = retained() - before
+
+        # The second poll brings the first transitions into the history, growth is counted from there
+        after_polls = []
+        for poll in range(1, polls):
+            fleet.poll = poll
+            await portainer.update(no_throttle=True)
+            write_states(entities)
+            after_polls.append(retained())
+        growth = after_polls[-1] - after_polls[0] if len(after_polls) > 1 else 0
+
+        await portainer.close()
+        session_closed = portainer._session is None
+        peak = tracemalloc.get_traced_memory()[1] - before
+        del entities, portainer
+        leftover = retained() - before
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "containers": num_containers,
+        "footprint": footprint,
+        "growth": growth,
+        "peak": peak,
+        "leftover": leftover,
+        "session_closed": session_closed,
+    }
+
+
+def check(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return the failures of a measurement against its baseline."""
+    failures = []
+    if not result["session_closed"]:
+        failures.append("the aiohttp session was left open after close()")
+    if result["leftover"] > LEFTOVER_LIMIT:
+        failures.append(f'{result["leftover"]} B were left behind after close(), the limit is {LEFTOVER_LIMIT} B')
+    if result["growth"] > GROWTH_LIMIT:
+        failures.append(f'growth across polls {result["growth"]} B is above the limit of {GROWTH_LIMIT} B')
+    if baseline:
+        allowed = int(baseline["footprint"] * (1 + tolerance))
+        if result["footprint"] > allowed:
+            failures.append(f'footprint {result["footprint"]} B is above the allowed {allowed} B')
+        allowed = max(GROWTH_FLOOR, int(baseline["growth"] * (1 + tolerance)))
+        if result["growth"] > allowed:
+            failures.append(f'growth across polls {result["growth"]} B is above the allowed {allowed} B')
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="fleet sizes in containers")
+    parser.add_argument("--polls", type=int, default=DEFAULT_POLLS, help="poll cycles per fleet (at least 3)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed footprint above the baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measurements as the new baseline")
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baselines = json.load(baseline_file)
+
+    # One-time process-wide allocations (lazy imports, the JSON backend's key cache) are not part of the model
+    asyncio.run(measure(10, 3))
+
+    failed = False
+    for size in args.sizes:
+        result = asyncio.run(measure(size, max(3, args.polls)))
+        # A new baseline is only measured against the absolute limits, a leak must not become the baseline
+        failures = check(result, {} if args.update_baseline else baselines.get(str(size), {}), args.tolerance)
+        print(
+            f'{size:>6} containers: footprint {result["footprint"] / 1024:>9.1f} KiB, '
+            f'growth {result["growth"] / 1024:>7.1f} KiB, peak {result["peak"] / 1024:>9.1f} KiB, '
+            f'leftover after close {result["leftover"] / 1024:>7.1f} KiB'
+        )
+        for failure in failures:
+            print(f"  FAIL: {failure}")
+        failed = failed or bool(failures)
+        if args.update_baseline:
+            baselines[str(size)] = {"footprint": result["footprint"], "growth": result["growth"]}
+
+    if args.update_baseline:
+        if failed:
+            print("Baseline not written, the measurements failed")
+            return 1
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Serve Portainer API traffic recorded with the porthole.record_traffic service.
+
+Every recorded response, errors included, is served back with its original latency. Requests
+for a path recorded several times get the recordings in order, one per request, starting over
+once all were served, so successive polls see the changes of the recording.
+
+Responses also keep to the recorded timeline: a request arriving before the recorded one
+started (relative to the first request of the replay) waits for it, so the replay runs at the
+pace of the recording. --speed scales both the waits and the latencies, --no-pacing only keeps
+the latencies.
+
+    python scripts/replay_portainer.py porthole_traffic_1700000000.jsonl --port 9000
+    python scripts/replay_portainer.py traffic.jsonl --speed 4       # four times faster
+    python scripts/replay_portainer.py traffic.jsonl --no-pacing     # as fast as it is polled
+    python scripts/replay_portainer.py traffic.jsonl --speed 0       # no delays at all
+
+Then point Porthole (any username and password) or the benchmarks at http://127.0.0.1:9000.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger("replay_portainer")
+
+
+def request_key(path: str, params: Dict[str, str]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Return the key a request is matched on, the query parameter order does not matter."""
+    return path, tuple(sorted((str(key), str(value)) for key, value in params.items()))
+
+
+class ReplayServer:
+    """Recorded responses per request, served round-robin on the recorded timeline with their original latency."""
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float, pacing: bool = True) -> None:
+        self._speed: float = speed
+        self._pacing: bool = pacing and speed > 0
+        self._responses: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        self._next: Dict[tuple, int] = defaultdict(int)
+        for entry in entries:
+            self._responses[request_key(entry["path"], entry.get("params") or {})].append(entry)
+        # The timeline of the recording, a round-robin cycle starts over after its whole duration
+        self._first_offset: float = min((entry["offset"] for entry in entries), default=0.0)
+        self._duration: float = max((entry["offset"] + entry["elapsed"] for entry in entries), default=0.0) - self._first_offset
+        self._replay_started: Optional[float] = None
+        self.served: int = 0
+        self.missed: int = 0
+
+    def _pacing_delay(self, entry: Dict[str, Any], cycle: int) -> float:
+        """Return how long to wait before the recorded request of a cycle started, 0 if it already did."""
+        now = asyncio.get_running_loop().time()
+        if self._replay_started is None:
+            self._replay_started = now
+        due = self._replay_started + (cycle * self._duration + entry["offset"] - self._first_offset) / self._speed
+        return max(0.0, due - now)
+
+    async def handle_auth(self, request: web.Request) -> web.Response:
+        """Accept any credentials, the recording holds no JWT."""
+        return web.json_response({"jwt": "replay"})
+
+    async def handle_get(self, request: web.Request) -> web.Response:
+        """Serve the next recorded response for the request."""
+        key = request_key(request.path, dict(request.query))
+        responses = self._responses.get(key)
+        if not responses:
+            self.missed += 1
+            _LOGGER.warning("No recording for %s %s", request.path, dict(request.query))
+            return web.json_response({"message": "not recorded"}, status=404)
+
+        cycle, index = divmod(self._next[key], len(responses))
+        entry = responses[index]
+        self._next[key] += 1
+        self.served += 1
+        if self._speed > 0:
+            delay = self._pacing_delay(entry, cycle) if self._pacing else 0.0
+            await asyncio.sleep(delay + entry["elapsed"] / self._speed)
+
+        if "body_base64" in entry:
+            return web.Response(body=base64.b64decode(entry["body_base64"]), status=entry["status"])
+        return web.Response(
+            body=json.dumps(entry["body"], separators=(",", ":")).encode(),
+            status=entry["status"],
+            content_type="application/json",
+        )
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/auth", self.handle_auth)
+        app.router.add_get("/{path:.*}", self.handle_get)
+        return app
+
+
+def load_entries(path: str) -> List[Dict[str, Any]]:
+    """Load a recording, in the order the responses were requested."""
+    with open(path, encoding="utf-8") as traffic_file:
+        entries = [json.loads(line) for line in traffic_file if line.strip()]
+    return sorted(entries, key=lambda entry: entry["offset"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="JSON lines file written by porthole.record_traffic")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--speed", type=float, default=1.0, help="time divisor for the timeline and the latencies, 0 serves without delay")
+    parser.add_argument("--no-pacing", dest="pacing", action="store_false", help="ignore the recorded timeline, only keep the latencies")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    entries = load_entries(args.recording)
+    replay = ReplayServer(entries, args.speed, args.pacing)
+    requests = {request_key(entry["path"], entry.get("params") or {}) for entry in entries}
+    _LOGGER.info("Serving %d recorded responses for %d requests", len(entries), len(requests))
+    web.run_app(replay.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The integration is imported as custom_components.porthole, the way Home Assistant loads it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
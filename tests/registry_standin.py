@@ -0,0 +1,66 @@
+"""A registry:2 stand-in for the image update checks.
+
+Serves manifest HEAD requests behind an anonymous bearer challenge the way Docker Hub and
+GHCR do: a request without a token gets a 401 pointing at the token endpoint, a request
+with the token gets the manifest digest in the Docker-Content-Digest header.
+"""
+from typing import Dict, Optional
+
+from aiohttp import web
+
+TOKEN = "standin-token"
+
+
+class RegistryStandin:
+    """Manifest digests per (repository, tag), served over plain HTTP on 127.0.0.1."""
+
+    def __init__(self) -> None:
+        self.digests: Dict[tuple, str] = {}
+        self.failing: set = set()  # Repositories answering 500
+        self.token_requests: int = 0
+        self.manifest_requests: int = 0
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def registry(self) -> str:
+        """Return the registry part of image references pointing at the stand-in."""
+        return f"127.0.0.1:{self.port}"
+
+    def image(self, repository: str, tag: str = "latest") -> str:
+        """Return the image reference of a repository on the stand-in."""
+        return f"{self.registry}/{repository}:{tag}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/token", self._handle_token)
+        app.router.add_route("HEAD", "/v2/{repository:.+}/manifests/{tag}", self._handle_manifest)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_token(self, request: web.Request) -> web.Response:
+        self.token_requests += 1
+        if not request.query.get("scope", "").startswith("repository:"):
+            return web.json_response({"errors": [{"code": "DENIED"}]}, status=400)
+        return web.json_response({"token": TOKEN, "expires_in": 300})
+
+    async def _handle_manifest(self, request: web.Request) -> web.Response:
+        self.manifest_requests += 1
+        repository, tag = request.match_info["repository"], request.match_info["tag"]
+        if request.headers.get("Authorization") != f"Bearer {TOKEN}":
+            challenge = f'Bearer realm="http://{self.registry}/token",service="standin",scope="repository:{repository}:pull"'
+            return web.Response(status=401, headers={"WWW-Authenticate": challenge})
+        if repository in self.failing:
+            return web.Response(status=500)
+        digest = self.digests.get((repository, tag))
+        if digest is None:
+            return web.Response(status=404)
+        return web.Response(status=200, headers={"Docker-Content-Digest": digest})
@@ -0,0 +1,96 @@
+import asyncio
+
+import aiohttp
+
+from custom_components.porthole.image_updates import RegistryDigestCache
+from custom_components.porthole.portainer_server import PortainerServer
+from registry_standin import RegistryStandin
+
+CURRENT = "sha256:" + "1" * 64
+NEWER = "sha256:" + "2" * 64
+
+
+def _run(test):
+    """Run a test coroutine against a fresh registry stand-in."""
+    async def _with_registry():
+        registry = RegistryStandin()
+        await registry.start()
+        try:
+            await test(registry)
+        finally:
+            await registry.stop()
+
+    asyncio.run(_with_registry())
+
+
+def test_digest_behind_bearer_challenge():
+    async def test(registry):
+        registry.digests[("library/app", "1")] = CURRENT
+        cache = RegistryDigestCache(ttl=300, failure_ttl=60)
+        async with aiohttp.ClientSession() as session:
+            assert await cache.get(session, registry.image("library/app", "1")) == CURRENT
+            # Served from the cache, no request reaches the registry
+            assert await cache.get(session, registry.image("library/app", "1")) == CURRENT
+        assert registry.token_requests == 1
+        assert registry.manifest_requests == 2  # Challenge, then the authorized HEAD
+        assert cache.hits == 1
+
+    _run(test)
+
+
+def test_concurrent_lookups_share_one_request():
+    async def test(registry):
+        registry.digests[("library/app", "1")] = CURRENT
+        cache = RegistryDigestCache(ttl=300, failure_ttl=60)
+        async with aiohttp.ClientSession() as session:
+            digests = await asyncio.gather(*(cache.get(session, registry.image("library/app", "1")) for _ in range(5)))
+        assert digests == [CURRENT] * 5
+        assert registry.manifest_requests == 2
+
+    _run(test)
+
+
+def test_missing_and_failing_manifests_resolve_to_none():
+    async def test(registry):
+        registry.failing.add("library/broken")
+        cache = RegistryDigestCache(ttl=300, failure_ttl=60)
+        async with aiohttp.ClientSession() as session:
+            assert await cache.get(session, registry.image("library/unknown")) is None
+            assert await cache.get(session, registry.image("library/broken")) is None
+            requests = registry.manifest_requests
+            # Failures are cached as well
+            assert await cache.get(session, registry.image("library/broken")) is None
+        assert registry.manifest_requests == requests
+
+    _run(test)
+
+
+def test_image_update_results():
+    async def test(registry):
+        registry.digests[("library/current", "latest")] = CURRENT
+        registry.digests[("library/outdated", "latest")] = NEWER
+        registry.failing.add("library/broken")
+
+        portainer = PortainerServer("http://127.0.0.1:1", "user", "password")
+        containers = [
+            {"image": registry.image(repository), "image_id": f"sha256:{repository[-1] * 64}"}
+            for repository in ("library/current", "library/outdated", "library/broken")
+        ]
+        portainer.portainer_obj = {"endpoints": [{"endpoint_id": 1, "containers": containers}]}
+        # RepoDigests of the local images, as the image inspect of the endpoint reports them
+        for container_info in containers:
+            portainer._local_image_digests[(1, container_info["image_id"])] = [CURRENT]
+        try:
+            await portainer.update_image_updates()
+        finally:
+            await portainer.close()
+
+        current, outdated, broken = (portainer.image_update_status(1, container_info) for container_info in containers)
+        assert current["update_available"] is False
+        assert outdated["update_available"] is True
+        assert outdated["remote_digest"] == NEWER
+        assert outdated["local_digests"] == [CURRENT]
+        assert broken["update_available"] is None
+        assert broken["remote_digest"] is None
+
+    _run(test)